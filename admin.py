@@ -0,0 +1,51 @@
+# admin.py — scrape/publish subsystem, mounted by app.py under /admin
+#
+# Nothing here imports the scraper stack (full_roster_scraper -> requests,
+# BeautifulSoup, lxml) at module load: those are imported inside the scrape
+# job, so a serving process that never scrapes never pays for them.
+import os
+from pathlib import Path
+
+from fastapi import APIRouter, HTTPException, Request
+
+from jobs import JOB_DIR, JobRunner
+
+router = APIRouter()
+
+# Scrapes run on a background thread; the API keeps serving the current roster.
+# Job state lives under JOB_DIR, so with several workers any of them can report
+# on a job, and a second scrape is refused while one runs anywhere.
+JOBS = JobRunner(root=JOB_DIR)
+
+def require_admin(request: Request):
+    if request.query_params.get("key") != os.environ.get("ADMIN_KEY"):
+        raise HTTPException(status_code=403, detail="forbidden")
+
+def _scrape_job(job):
+    from full_roster_scraper import build_roster
+    out = Path("/tmp/roster.csv")
+    build_roster(out, progress=job.update)
+    # only the fighters/fields that moved are published; no change -> no commit
+    job.update(stage="publish")
+    from publish import publish, target_from_env
+    return {"wrote": str(out), "publish": publish(out, target_from_env())}
+
+@router.api_route("/admin/scrape", methods=["GET", "POST"])
+def admin_scrape(request: Request):
+    # Run scraper + publish in the background; poll /admin/jobs/{id}
+    require_admin(request)
+    job, created = JOBS.submit("scrape", _scrape_job)
+    return {"ok": True, "job": job["id"], "created": created, "status": f"/admin/jobs/{job['id']}"}
+
+@router.get("/admin/jobs")
+def admin_jobs(request: Request):
+    require_admin(request)
+    return JOBS.list()
+
+@router.get("/admin/jobs/{job_id}")
+def admin_job(job_id: str, request: Request):
+    require_admin(request)
+    job = JOBS.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="no such job")
+    return job
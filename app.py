@@ -1,56 +1,28 @@
 # app.py — one-file FastAPI app with mobile UI + JSON API
-from fastapi import FastAPI, Request, HTTPException
-from fastapi.responses import HTMLResponse, JSONResponse
-import pandas as pd
+import json, os, re, sys, time
 from pathlib import Path
+from typing import Any
+
+from fastapi import Body, FastAPI, Request, HTTPException
+from fastapi.responses import HTMLResponse, JSONResponse, FileResponse, StreamingResponse, Response
+from starlette.routing import Match
 import numpy as np
+import matrix
+from admin import JOBS, require_admin, router as admin_router
+from lru import LRU
+from model import predict_idx
+from simulate import simulate
+from roster_store import RosterStore
+from metrics import REQUESTS, STAGES, Sampler, render_counters, timer
+from workers import EXPECTED, Registry
 app = FastAPI(title="MMA Model")
-# --- ADMIN SCRAPE ENDPOINT (FastAPI) ---
-import os, base64, json
-from pathlib import Path
-import requests
-from fastapi import HTTPException, Request
-from full_roster_scraper import build_roster  # uses your existing scraper
-
-def _upload_to_github(path: Path):
-    repo   = os.environ["GH_REPO"]      # e.g. "yourname/MMA-model"
-    branch = os.environ.get("GH_BRANCH", "main")
-    token  = os.environ["GH_PAT"]
-    api = f"https://api.github.com/repos/{repo}/contents/data/roster.csv"
-
-    # get current sha (if file exists)
-    sha = None
-    r = requests.get(api, params={"ref": branch},
-                     headers={"Authorization": f"token {token}",
-                              "Accept": "application/vnd.github+json"})
-    if r.status_code == 200:
-        sha = r.json().get("sha")
-
-    content = base64.b64encode(path.read_bytes()).decode("utf-8")
-    body = {"message": "Update roster.csv via Render scraper",
-            "content": content, "branch": branch}
-    if sha: body["sha"] = sha
-
-    r = requests.put(api, headers={"Authorization": f"token {token}",
-                                   "Accept": "application/vnd.github+json"},
-                     data=json.dumps(body))
-    r.raise_for_status()
-
-@app.get("/admin/scrape")
-async def admin_scrape(request: Request):
-    if request.query_params.get("key") != os.environ.get("ADMIN_KEY"):
-        raise HTTPException(status_code=403, detail="forbidden")
-
-    out = Path("/tmp/roster.csv")
-    build_roster(out)
-    _upload_to_github(out)
-    return {"ok": True, "wrote": str(out)}
+app.include_router(admin_router)      # /admin/scrape, /admin/jobs (scraper loads on first scrape)
 
 DATA = Path("data")
 DATA.mkdir(exist_ok=True)
 ROSTER = DATA / "roster.csv"
 
-# Seed roster so it works instantly; daily workflow will overwrite with full roster
+# Seed roster so it works instantly; deploys assemble the published roster here (publish.py)
 if not ROSTER.exists():
     ROSTER.write_text(
         "Name,Age,Height_in,Reach_in,Stance,SSLpm,SSApm,Acc,Def,KDpm,TD15,TDAcc,TDD,TopCtl,BottomCtl,Sub15,OppEsc,Attpm,LateRet,KDtakenpm,KDlast12m,Whiff,WPA,Fouls,Camp,HeadRate,CARDIO_ret,FinishRate\n"
@@ -60,14 +32,133 @@ if not ROSTER.exists():
         "Brendan Allen,29,74,75,Orthodox,4.3,3.5,0.54,0.47,0.16,1.4,0.44,0.55,0.28,0.22,1.7,0.52,8.5,0.76,0.10,0.12,0.38,0.28,0.05,0.00,0.68,0.80,0.65\n"
     )
 
-DIV_BENCH = [
-    ("SSLpm",3.00,1.20),("SSApm",3.00,1.20),("Acc",0.47,0.08),("Def",0.53,0.08),("KDpm",0.15,0.20),
-    ("TD15",1.50,1.50),("TDAcc",0.38,0.15),("TDD",0.65,0.20),("TopCtl",0.15,0.15),("BottomCtl",0.15,0.15),
-    ("Sub15",0.40,0.60),("OppEsc",0.50,0.25),("Attpm",8.00,2.50),("LateRet",0.75,0.20),
-    ("KDtakenpm",0.12,0.18),("KDlast12m",0.20,0.40),("Whiff",0.40,0.15),("WPA",0.00,1.00),("Fouls",0.10,0.20),
-    ("Camp",0.00,1.00),("HeadRate",0.70,0.15),("CARDIO_ret",0.75,0.20),("FinishRate",0.50,0.25),
-]
-ZMAP = {m:(mu,sd) for m,mu,sd in DIV_BENCH}
+# Parsed once at startup; swapped atomically when data/roster.csv changes
+STORE = RosterStore(ROSTER)
+
+# ---------- Workers ----------
+# Under `uvicorn --workers N` each process has its own STORE; all of them map the
+# same roster.bin (scores included), so the roster is in memory once. The
+# heartbeat thread keeps each store current and records what it serves, so any
+# worker can answer /healthz for the whole pool.
+POOL = Registry()
+
+def _worker_state():
+    # what this worker serves, plus its metrics so any worker can sum the pool
+    scraper = sys.modules.get("full_roster_scraper")
+    return {"roster": STORE.get().info(),
+            "metrics": {"requests": REQUESTS.snapshot(), "stages": STAGES.snapshot(),
+                        "scraper": dict(scraper.COUNTERS) if scraper else {},
+                        "predict_cache": _cache_counts()}}
+
+@app.get("/healthz")
+def healthz():
+    roster = STORE.get()
+    pool = POOL.live()
+    # grouped by roster sha: version is a per-process counter, so a restarted
+    # worker serving the same file reports a lower version than its peers
+    versions = {}
+    for w in pool:
+        v = w["roster"]["sha"][:12]
+        versions[v] = versions.get(v, 0) + 1
+    return JSONResponse({"ok": True, "pid": os.getpid(), "roster": roster.info(),
+                         "workers": len(pool), "expected_workers": EXPECTED,
+                         "versions": versions, "converged": len(versions) <= 1})
+
+# ---------- Metrics ----------
+# Every request is timed into a per-route histogram. /metrics sums the whole
+# pool: this worker's live series plus every other live worker's heartbeat copy.
+# ?profile=1 (with the admin key, or PROFILE=1 in the env) also samples the
+# stacks running this request's endpoint (Sampler roots); the collapsed stacks are written to PROFILE_DIR (shared by all workers, newest
+# PROFILE_KEEP kept) and linked from the X-Profile header.
+PROFILE_DIR = Path(os.getenv("PROFILE_DIR", "data/.profiles"))
+PROFILE_KEEP = int(os.getenv("PROFILE_KEEP", "20"))
+PROFILE_INTERVAL = float(os.getenv("PROFILE_INTERVAL", "0.001"))
+
+def _save_profile(pid, prof):
+    try:
+        PROFILE_DIR.mkdir(parents=True, exist_ok=True)
+        tmp = PROFILE_DIR / f"{pid}.tmp"
+        tmp.write_text(json.dumps(prof))
+        os.replace(tmp, PROFILE_DIR / f"{pid}.json")
+        for p in sorted(PROFILE_DIR.glob("*.json"), key=lambda p: p.stat().st_mtime, reverse=True)[PROFILE_KEEP:]:
+            p.unlink(missing_ok=True)
+    except OSError as e:
+        print(f"[warn] profile {pid} not saved: {e}", file=sys.stderr)
+
+def _may_profile(request):
+    if request.query_params.get("profile") != "1": return False
+    key = os.environ.get("ADMIN_KEY")
+    return os.getenv("PROFILE") == "1" or (key is not None and request.query_params.get("key") == key)
+
+def _endpoint_code(request):
+    for r in app.router.routes:
+        if getattr(r, "endpoint", None) and r.matches(request.scope)[0] == Match.FULL:
+            return r.endpoint.__code__
+    return None
+
+@app.middleware("http")
+async def _observe(request: Request, call_next):
+    code = _endpoint_code(request) if _may_profile(request) else None
+    sampler = Sampler(PROFILE_INTERVAL, roots={code}).__enter__() if code else None
+    t = time.perf_counter()
+    status = 500
+    try:
+        response = await call_next(request)
+        status = response.status_code
+    finally:
+        route = getattr(request.scope.get("route"), "path", "unmatched")
+        REQUESTS.observe(time.perf_counter() - t, request.method, route, status)
+        if sampler:
+            sampler.__exit__()
+    if sampler:
+        pid = f"{os.getpid():x}-{int(time.time() * 1000):x}-{id(sampler) & 0xffff:04x}"
+        _save_profile(pid, {"route": route, "samples": sampler.samples, "stacks": sampler.collapsed()})
+        response.headers["X-Profile"] = f"/admin/profiles/{pid}"
+    return response
+
+def _sum(dicts):
+    out = {}
+    for d in dicts:
+        for k, v in d.items():
+            out[k] = out.get(k, 0) + v
+    return out
+
+def _cache_counts():
+    return {k: v for k, v in PREDICT_CACHE.stats().items() if k in ("size", "hits", "misses")}
+
+@app.get("/metrics")
+def metrics():
+    # Other workers' numbers are up to one heartbeat (<= 5 s) old; a worker that
+    # exits takes its counts with it, which Prometheus treats as a counter reset.
+    roster = STORE.get()
+    pool = POOL.live()
+    others = [w.get("metrics", {}) for w in pool if w["pid"] != os.getpid()]
+    lines = (REQUESTS.render([o.get("requests", []) for o in others])
+             + STAGES.render([o.get("stages", []) for o in others]))
+    scraper = sys.modules.get("full_roster_scraper")      # only loaded once a scrape has run
+    counts = _sum([dict(scraper.COUNTERS) if scraper else {}] + [o.get("scraper", {}) for o in others])
+    if counts:
+        lines += render_counters("scraper_total", "Scraper counters (pages, bytes, retries, errors).", counts)
+    job = next((j for j in JOBS.list() if j["kind"] == "scrape"), None)
+    if job:
+        lines += render_counters("scrape_job", "Progress of the latest scrape job.",
+                                 {k: v for k, v in job["progress"].items() if isinstance(v, (int, float))}, "gauge")
+    lines += render_counters("predict_cache", "Prediction cache counters, summed over workers.",
+                             _sum([_cache_counts()] + [o.get("predict_cache", {}) for o in others]), "gauge")
+    lines += render_counters("roster", "Loaded roster generation.",
+                             {"version": roster.version, "fighters": len(roster), "workers": len(pool)}, "gauge")
+    return Response("\n".join(lines) + "\n", media_type="text/plain; version=0.0.4")
+
+@app.get("/admin/profiles/{pid}")
+def admin_profile(pid: str, request: Request):
+    if request.query_params.get("key") != os.environ.get("ADMIN_KEY") and os.getenv("PROFILE") != "1":
+        raise HTTPException(status_code=403, detail="forbidden")
+    path = PROFILE_DIR / f"{pid}.json"
+    if not re.fullmatch(r"[0-9a-f-]+", pid) or not path.exists():
+        raise HTTPException(status_code=404, detail="no such profile")
+    prof = json.loads(path.read_text())
+    return Response(prof["stacks"], media_type="text/plain",
+                    headers={"X-Route": prof["route"], "X-Samples": str(prof["samples"])})
 
 HTML = """<!doctype html><html><head><meta charset="utf-8">
 <meta name="viewport" content="width=device-width, initial-scale=1">
@@ -95,10 +186,14 @@ input,button{padding:10px;border-radius:8px;border:1px solid #ccc}button{border:
 <div class="pill">B SUB: <span id="b_sub">--%</span></div>
 <div class="pill">B DEC: <span id="b_dec">--%</span></div></div></div>
 <script>
-async function loadRoster(){const r=await fetch('/api/roster');const names=await r.json();
-const dl=document.getElementById('fighters');dl.innerHTML='';names.forEach(n=>{const o=document.createElement('option');o.value=n;dl.appendChild(o);});}
+let timer=null;
+async function suggest(q){if(q.trim().length<2)return;const r=await fetch(`/api/search?q=${encodeURIComponent(q)}&k=8`);const hits=await r.json();
+const dl=document.getElementById('fighters');dl.innerHTML='';hits.forEach(h=>{const o=document.createElement('option');o.value=h.name;dl.appendChild(o);});}
+function onType(e){clearTimeout(timer);const q=e.target.value;timer=setTimeout(()=>suggest(q),120);}
+['a','b'].forEach(id=>document.getElementById(id).addEventListener('input',onType));
 async function predict(){const a=document.getElementById('a').value,b=document.getElementById('b').value;
 const r=await fetch(`/api/predict?a=${encodeURIComponent(a)}&b=${encodeURIComponent(b)}`);const js=await r.json();
+if(!r.ok){alert(js.detail||'Prediction failed');return;}
 document.getElementById('out').style.display='block';
 document.getElementById('pA').innerText=Math.round(js.P_A*100)+'%';
 document.getElementById('pB').innerText=Math.round((1-js.P_A)*100)+'%';
@@ -108,136 +203,154 @@ document.getElementById('a_dec').innerText=Math.round(js.P_A_DEC*100)+'%';
 document.getElementById('b_ko').innerText=Math.round(js.P_B_KO*100)+'%';
 document.getElementById('b_sub').innerText=Math.round(js.P_B_SUB*100)+'%';
 document.getElementById('b_dec').innerText=Math.round(js.P_B_DEC*100)+'%';}
-loadRoster();
 </script></body></html>"""
 
-def z(x, mu, sd):
-    try: return max(-3.0, min(3.0, (float(x)-mu)/sd)) if sd else 0.0
-    except: return 0.0
-
-def rating(a, b):
-    ZA = lambda m: z(a.get(m,0), *ZMAP.get(m,(0,1)))
-    ZB = lambda m: z(b.get(m,0), *ZMAP.get(m,(0,1)))
-    STR_A = 0.50*(ZA("SSLpm")-ZA("SSApm")) + 0.20*ZA("Acc") + 0.20*ZA("Def") + 0.10*ZA("KDpm")
-    STR_B = 0.50*(ZB("SSLpm")-ZB("SSApm")) + 0.20*ZB("Acc") + 0.20*ZB("Def") + 0.10*ZB("KDpm")
-    GRP_A = 0.35*ZA("TD15") + 0.20*ZA("TDAcc") + 0.25*ZA("TopCtl") + 0.20*ZA("Sub15") - 0.15*ZA("OppEsc")
-    GRP_B = 0.35*ZB("TD15") + 0.20*ZB("TDAcc") + 0.25*ZB("TopCtl") + 0.20*ZB("Sub15") - 0.15*ZB("OppEsc")
-    GRP_DA= 0.55*ZA("TDD") + 0.20*ZA("BottomCtl")
-    GRP_DB= 0.55*ZB("TDD") + 0.20*ZB("BottomCtl")
-    PACE_A= 0.60*ZA("Attpm") + 0.40*ZA("LateRet")
-    PACE_B= 0.60*ZB("Attpm") + 0.40*ZB("LateRet")
-    DUR_A = 0.55*(-ZA("KDtakenpm")) + 0.25*(-ZA("KDlast12m")) + 0.20*(-ZA("SSApm"))
-    DUR_B = 0.55*(-ZB("KDtakenpm")) + 0.25*(-ZB("KDlast12m")) + 0.20*(-ZB("SSApm"))
-    IQ_A  = 0.40*ZA("Acc") - 0.20*ZA("Whiff") + 0.40*ZA("WPA") - 0.20*ZA("Fouls")
-    IQ_B  = 0.40*ZB("Acc") - 0.20*ZB("Whiff") + 0.40*ZB("WPA") - 0.20*ZB("Fouls")
-    CTX_A = 0.25*ZA("Camp"); CTX_B = 0.25*ZB("Camp")
-    R_A = 0.28*STR_A + 0.24*(GRP_A - 0.6*GRP_DA) + 0.14*PACE_A + 0.16*DUR_A + 0.12*IQ_A + 0.06*CTX_A
-    R_B = 0.28*STR_B + 0.24*(GRP_B - 0.6*GRP_DB) + 0.14*PACE_B + 0.16*DUR_B + 0.12*IQ_B + 0.06*CTX_B
-    return R_A, R_B
-
-def softmax3(e1,e2,e3):
-    mx=max(e1,e2,e3); a=np.exp(e1-mx); b=np.exp(e2-mx); c=np.exp(e3-mx); s=a+b+c; return a/s,b/s,c/s
-
-def methods(a,b):
-    ZA = lambda m: z(a.get(m,0), *ZMAP.get(m,(0,1)))
-    ZB = lambda m: z(b.get(m,0), *ZMAP.get(m,(0,1)))
-    eta_A_KO  = -0.30 + 0.55*ZA("KDpm") - 0.45*(0.55*(-ZB("KDtakenpm")) + 0.25*(-ZB("KDlast12m")) + 0.20*(-ZB("SSApm"))) + 0.20*ZA("HeadRate")
-    eta_A_SUB = -0.50 + 0.60*ZA("Sub15") + 0.45*ZA("TDAcc") - 0.55*ZB("TDD") + 0.25*ZA("TopCtl")
-    eta_A_DEC = -0.10 + 0.40*(0.60*ZA("Attpm") + 0.40*ZA("LateRet")) + 0.30*ZA("CARDIO_ret") - 0.25*(ZA("FinishRate")+ZB("FinishRate"))
-    qA_KO,qA_SUB,qA_DEC = softmax3(eta_A_KO,eta_A_SUB,eta_A_DEC)
-
-    eta_B_KO  = -0.30 + 0.55*ZB("KDpm") - 0.45*(0.55*(-ZA("KDtakenpm")) + 0.25*(-ZA("KDlast12m")) + 0.20*(-ZA("SSApm"))) + 0.20*ZB("HeadRate")
-    eta_B_SUB = -0.50 + 0.60*ZB("Sub15") + 0.45*ZB("TDAcc") - 0.55*ZA("TDD") + 0.25*ZB("TopCtl")
-    eta_B_DEC = -0.10 + 0.40*(0.60*ZB("Attpm") + 0.40*ZB("LateRet")) + 0.30*ZB("CARDIO_ret") - 0.25*(ZA("FinishRate")+ZB("FinishRate"))
-    qB_KO,qB_SUB,qB_DEC = softmax3(eta_B_KO,eta_B_SUB,eta_B_DEC)
-    return dict(qA_KO=qA_KO,qA_SUB=qA_SUB,qA_DEC=qA_DEC,qB_KO=qB_KO,qB_SUB=qB_SUB,qB_DEC=qB_DEC)
-
-def pick(df, name):
-    r = df[df["Name"].str.lower()==name.lower()]
-    if r.empty: raise ValueError(f"Fighter not found: {name}")
-    return {k:(v if pd.notna(v) else 0) for k,v in r.iloc[0].to_dict().items()}
-
 @app.get("/", response_class=HTMLResponse)
 def index():
     return HTMLResponse(HTML)
 
 @app.get("/api/roster")
 def api_roster():
-    df = pd.read_csv(ROSTER)
-    names = sorted(df["Name"].dropna().astype(str).unique().tolist())
-    return JSONResponse(names)
+    return JSONResponse(STORE.get().names)
 
-@app.get("/api/predict")
-def api_predict(a: str, b: str):
-    df = pd.read_csv(ROSTER)
-    A, B = pick(df, a), pick(df, b)
-    R_A, R_B = rating(A,B)
-    P_A = 1/(1+np.exp(-1.35*(0.80*(R_A-R_B))))
-    m = methods(A,B)
-    out = dict(
-        P_A=float(P_A),
-        P_A_KO=float(P_A*m["qA_KO"]), P_A_SUB=float(P_A*m["qA_SUB"]), P_A_DEC=float(P_A*m["qA_DEC"]),
-        P_B_KO=float((1-P_A)*m["qB_KO"]), P_B_SUB=float((1-P_A)*m["qB_SUB"]), P_B_DEC=float((1-P_A)*m["qB_DEC"]),
-        R_A=float(R_A), R_B=float(R_B),
+@app.get("/api/search")
+def api_search(q: str = "", k: int = 10):
+    hits = STORE.get().index.search(q, k=max(1, min(k, 50)))
+    return JSONResponse([{"name": n, "score": s} for n, s in hits])
+
+@app.get("/api/roster/version")
+def api_roster_version():
+    return JSONResponse(STORE.get().info())
+
+@app.post("/admin/reload")
+async def admin_reload(request: Request):
+    require_admin(request)
+    force = request.query_params.get("force") == "1"
+    return JSONResponse(STORE.reload(force=force).info())
+
+# Results keyed by (roster sha, lower row, higher row); (b, a) is served by flipping
+PREDICT_CACHE = LRU(int(os.getenv("PREDICT_CACHE_SIZE", "4096")), float(os.getenv("PREDICT_CACHE_TTL", "3600")))
+PREDICT_MAX_AGE = int(os.getenv("PREDICT_MAX_AGE", "60"))
+
+def _flip(p):
+    # the same fight seen from the other corner
+    return dict(
+        P_A=1.0-p["P_A"],
+        P_A_KO=p["P_B_KO"], P_A_SUB=p["P_B_SUB"], P_A_DEC=p["P_B_DEC"],
+        P_B_KO=p["P_A_KO"], P_B_SUB=p["P_A_SUB"], P_B_DEC=p["P_A_DEC"],
+        R_A=p["R_B"], R_B=p["R_A"],
     )
-    return JSONResponse(out)
-# --- ADMIN SCRAPER (FastAPI) ---
-import os, base64, json
-from pathlib import Path
-import requests
-from fastapi import HTTPException, Request
-from full_roster_scraper import build_roster
-
-# Use your existing FastAPI instance (usually called "app" or "api")
-try:
-    app  # if "app" exists, use it
-except NameError:
+
+@app.get("/api/predict")
+def api_predict(a: str, b: str, request: Request):
+    roster = STORE.get()
     try:
-        app = api  # if "api" exists, use it
-    except NameError:
-        from fastapi import FastAPI
-        app = FastAPI()  # fallback (rarely needed)
-
-def _upload_to_github(path: Path):
-    repo   = os.environ["GH_REPO"]         # e.g. "jcj1996-ufc/MMA-model"
-    branch = os.environ.get("GH_BRANCH", "main")
-    token  = os.environ["GH_PAT"]
-
-    api_url = f"https://api.github.com/repos/{repo}/contents/data/roster.csv"
-    headers = {
-        "Authorization": f"token {token}",
-        "Accept": "application/vnd.github+json",
-    }
-
-    # get current SHA if file exists
-    sha = None
-    r = requests.get(api_url, params={"ref": branch}, headers=headers)
-    if r.status_code == 200:
-        sha = r.json().get("sha")
-
-    content = base64.b64encode(path.read_bytes()).decode("utf-8")
-    body = {
-        "message": "Update roster.csv via Render scraper",
-        "content": content,
-        "branch": branch,
-    }
-    if sha:
-        body["sha"] = sha
-
-    r = requests.put(api_url, headers=headers, data=json.dumps(body))
-    r.raise_for_status()
-
-@app.post("/admin/scrape")
-async def admin_scrape(request: Request):
-    # Require secret key
-    if request.query_params.get("key") != os.environ.get("ADMIN_KEY"):
-        raise HTTPException(status_code=403, detail="forbidden")
+        with timer("lookup"):
+            i, j = roster.idx(a), roster.idx(b)
+    except ValueError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    etag = f'"{roster.sha[:12]}-{i}-{j}"'
+    headers = {"ETag": etag, "Cache-Control": f"public, max-age={PREDICT_MAX_AGE}"}
+    if etag in [t.strip().removeprefix("W/") for t in request.headers.get("if-none-match", "").split(",")]:
+        return Response(status_code=304, headers=headers)
+    lo, hi = min(i, j), max(i, j)
+    out = PREDICT_CACHE.get((roster.sha, lo, hi))
+    if out is None:
+        with timer("scoring"):
+            p = predict_idx(roster.scores, lo, hi)
+            out = {k: float(v) for k,v in p.items()}
+        PREDICT_CACHE.put((roster.sha, lo, hi), out)
+    return JSONResponse(out if i == lo else _flip(out), headers=headers)
+
+@app.get("/api/predict/cache")
+def api_predict_cache():
+    return JSONResponse(PREDICT_CACHE.stats())
+
+SIM_MAX = int(os.getenv("SIM_MAX", "1000000"))
+
+@app.get("/api/simulate")
+def api_simulate(a: str, b: str, n: int = 100_000, rounds: int = 3, seed: int | None = None):
+    # Monte Carlo round-by-round outcome distribution (see simulate.py)
+    if not 1 <= n <= SIM_MAX:
+        raise HTTPException(status_code=422, detail=f"n must be between 1 and {SIM_MAX}")
+    if not 1 <= rounds <= 5:
+        raise HTTPException(status_code=422, detail="rounds must be between 1 and 5")
+    if seed is not None and seed < 0:
+        raise HTTPException(status_code=422, detail="seed must be >= 0")
+    roster = STORE.get()
+    try:
+        ia, ib = roster.idx(a), roster.idx(b)
+    except ValueError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    out = simulate(roster.scores, ia, ib, n=n, rounds=rounds, seed=seed)
+    return JSONResponse({"version": roster.version, "a": a, "b": b, **out})
 
-    # Run scraper
-    out = Path("/tmp/roster.csv")
-    build_roster(out)
+BATCH_MAX = int(os.getenv("BATCH_MAX", "20000"))
 
-    # Upload to GitHub
-    _upload_to_github(out)
+def predict_many(roster, pairs):
+    # pairs: [(a, b), ...] -> one result dict per pair, same fields as api_predict.
+    # Unknown fighters become a per-item error; the rest are scored in one pass.
+    results, ia, ib, slots = [], [], [], []
+    with timer("lookup"):
+        for a, b in pairs:
+            item = {"a": a, "b": b}
+            i, j = roster.find(a), roster.find(b)
+            if i is None or j is None:
+                item["error"] = "Fighter not found: " + ", ".join(n for n, x in ((a, i), (b, j)) if x is None)
+            else:
+                ia.append(i); ib.append(j); slots.append(len(results))
+            results.append(item)
+    if slots:
+        with timer("scoring"):
+            p = predict_idx(roster.scores, np.array(ia), np.array(ib))
+        cols = {k: v.tolist() for k,v in p.items()}
+        for j, s in enumerate(slots):
+            results[s].update({k: v[j] for k,v in cols.items()})
+    return results
+
+def _parse_pairs(body):
+    items = body.get("matchups") if isinstance(body, dict) else body
+    if not isinstance(items, list):
+        raise HTTPException(status_code=422, detail="expected a list of matchups")
+    if len(items) > BATCH_MAX:
+        raise HTTPException(status_code=413, detail=f"batch limited to {BATCH_MAX} matchups")
+    pairs = []
+    for it in items:
+        if isinstance(it, dict): a, b = it.get("a"), it.get("b")
+        elif isinstance(it, (list, tuple)) and len(it) == 2: a, b = it
+        else: a = b = None
+        if not isinstance(a, str) or not isinstance(b, str):
+            raise HTTPException(status_code=422, detail=f"bad matchup: {it!r}")
+        pairs.append((a, b))
+    return pairs
+
+@app.post("/api/predict/batch")
+def api_predict_batch(body: Any = Body(...)):
+    # sync, so lookups/scoring/encoding of up to BATCH_MAX pairs run in the
+    # threadpool, not on the event loop; FastAPI answers malformed JSON with 422
+    pairs = _parse_pairs(body)
+    roster = STORE.get()
+    return JSONResponse({"version": roster.version, "results": predict_many(roster, pairs)})
+
+@app.get("/api/matrix")
+def api_matrix(format: str = "json", names: str = ""):
+    # All-pairs P_A and A-side KO/SUB/DEC for the roster or a comma-separated subset
+    if format not in ("json", "npz"):
+        raise HTTPException(status_code=422, detail="format must be npz or json")
+    roster = STORE.get()
+    try:
+        idx = [roster.idx(n.strip()) for n in names.split(",") if n.strip()] if names else range(len(roster))
+    except ValueError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    if len(idx) > matrix.MATRIX_MAX:
+        raise HTTPException(status_code=413, detail=f"matrix limited to {matrix.MATRIX_MAX} fighters, got {len(idx)}")
+    d = matrix.build(roster, list(idx))
+    headers = {"X-Roster-Version": str(roster.version)}
+    if format == "npz":
+        return FileResponse(matrix.npz(d), media_type="application/octet-stream",
+                            filename=f"matrix-v{roster.version}.npz", headers=headers)
+    return StreamingResponse(matrix.iter_ndjson(d), media_type="application/x-ndjson", headers=headers)
 
-    return {"ok": True, "wrote": str(out)}
+# ---------- Heartbeat ----------
+# started last: _worker_state reads PREDICT_CACHE and the metrics defined above
+POOL.start(_worker_state, every=min(max(STORE.check_every, 1.0), 5.0))
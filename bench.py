@@ -0,0 +1,232 @@
+# bench.py — benchmarks + in-process load test for the prediction and scraping hot paths
+#
+#   python bench.py                              # sizes 1k,10k,100k + parser on fixtures -> bench.json
+#   python bench.py --sizes 1000 --pages DIR     # parser throughput over other saved profile pages
+#   python bench.py --compare old.json           # print deltas against an earlier run
+#   python bench.py --cold-start                 # startup budget only; exits 1 when over
+#
+# Everything runs against synthetic rosters in a temp dir; nothing touches data/.
+import argparse, asyncio, json, os, platform, subprocess, sys, tempfile, time
+from pathlib import Path
+
+import numpy as np
+
+HERE = Path(__file__).resolve().parent
+sys.path.insert(0, str(HERE))
+
+def _pct(xs):
+    a = np.asarray(xs) * 1000.0
+    return {"p50_ms": float(np.percentile(a, 50)), "p95_ms": float(np.percentile(a, 95)),
+            "p99_ms": float(np.percentile(a, 99)), "mean_ms": float(a.mean()), "n": len(a)}
+
+def _roster_csv(path, n, seed=0):
+    from model import synthetic_roster
+    df = synthetic_roster(n, seed)
+    df["Stance"] = "Orthodox"
+    df.to_csv(path, index=False)
+    return path
+
+# ---------- Engine ----------
+def bench_roster_load(tmp, n):
+    from roster_store import RosterStore
+    csv = _roster_csv(tmp / f"roster_{n}.csv", n)
+    t = time.perf_counter(); RosterStore(csv); cold = time.perf_counter() - t      # CSV parse + .bin write
+    t = time.perf_counter(); st = RosterStore(csv); warm = time.perf_counter() - t  # mmap .bin
+    return st.get(), {"csv_s": cold, "bin_s": warm, "source_warm": st.get().source}
+
+def bench_predict(roster, reps=5000, seed=0):
+    from model import predict_idx
+    rng = np.random.default_rng(seed)
+    names = [roster.name_list[i] for i in rng.integers(0, len(roster), 2 * reps)]
+    lat = []
+    for k in range(reps):
+        t = time.perf_counter()
+        p = predict_idx(roster.scores, roster.idx(names[2*k]), roster.idx(names[2*k+1]))
+        {f: float(v) for f, v in p.items()}
+        lat.append(time.perf_counter() - t)
+    return _pct(lat)
+
+def bench_batch(roster, pairs=100_000, seed=0):
+    from model import predict_idx
+    rng = np.random.default_rng(seed)
+    ia, ib = rng.integers(0, len(roster), pairs), rng.integers(0, len(roster), pairs)
+    t = time.perf_counter(); predict_idx(roster.scores, ia, ib); dt = time.perf_counter() - t
+    return {"pairs": pairs, "pairs_per_s": pairs / dt, "s": dt}
+
+def bench_matrix(roster, n=2000):
+    import matrix
+    idx = list(range(min(n, len(roster))))
+    t = time.perf_counter(); matrix.build(roster, idx); dt = time.perf_counter() - t
+    t = time.perf_counter(); matrix.build(roster, idx); hit = time.perf_counter() - t
+    return {"fighters": len(idx), "pairs_per_s": len(idx) ** 2 / dt, "build_s": dt, "cached_s": hit}
+
+def bench_parser(pages_dir):
+    from full_roster_scraper import bench_parsers
+    r = bench_parsers(sorted(Path(pages_dir).glob("*.html")))
+    return {"pages": r["pages"], "bs4_pages_per_s": r["bs4"], "lxml_pages_per_s": r["lxml"],
+            "mismatches": len(r["mismatches"])}
+
+# ---------- In-process load test ----------
+async def _asgi_get(app, path, query=""):
+    # minimal ASGI client: no sockets, no httpx
+    scope = {"type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1", "method": "GET",
+             "scheme": "http", "path": path, "raw_path": path.encode(), "root_path": "",
+             "query_string": query.encode(), "headers": [(b"host", b"bench")],
+             "client": ("127.0.0.1", 0), "server": ("bench", 80)}
+    status = {}
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+    async def send(msg):
+        if msg["type"] == "http.response.start": status["code"] = msg["status"]
+    await app(scope, receive, send)
+    return status.get("code")
+
+async def _load(app, reqs, concurrency):
+    sem = asyncio.Semaphore(concurrency)
+    lat, errors = [], 0
+    async def one(path, q):
+        nonlocal errors
+        async with sem:
+            t = time.perf_counter()
+            code = await _asgi_get(app, path, q)
+            lat.append(time.perf_counter() - t)
+            errors += code != 200
+    t = time.perf_counter()
+    await asyncio.gather(*(one(p, q) for p, q in reqs))
+    wall = time.perf_counter() - t
+    return {**_pct(lat), "rps": len(reqs) / wall, "errors": errors, "concurrency": concurrency}
+
+def bench_load(tmp, n, requests=2000, concurrency=32, seed=0):
+    from urllib.parse import urlencode
+    work = tmp / f"app_{n}"
+    (work / "data").mkdir(parents=True)
+    _roster_csv(work / "data" / "roster.csv", n, seed)
+    cwd = os.getcwd()
+    os.chdir(work)                          # app.py resolves data/ relative to the cwd
+    try:
+        import app
+        roster = app.STORE.get()
+        rng = np.random.default_rng(seed)
+        names = roster.name_list
+        pred = [("/api/predict", urlencode({"a": names[i], "b": names[j]}))
+                for i, j in rng.integers(0, len(names), (requests, 2))]
+        search = [("/api/search", urlencode({"q": names[i][:9]})) for i in rng.integers(0, len(names), requests)]
+        out = {"predict": asyncio.run(_load(app.app, pred, concurrency)),
+               "predict_hot": asyncio.run(_load(app.app, pred[:50] * (requests // 50), concurrency)),
+               "search": asyncio.run(_load(app.app, search, concurrency))}
+        out["predict_cache"] = app.PREDICT_CACHE.stats()
+        return out
+    finally:
+        os.chdir(cwd)
+
+# ---------- Cold start ----------
+# Fresh interpreter per run, as on a free-tier wake-up: time to `import app` and
+# to the first /api/predict response. "bin" is the deployed case (render.yaml
+# prebuilds roster.bin); "csv" has to parse the roster first and is reported only.
+COLD_IMPORT_BUDGET = float(os.getenv("COLD_IMPORT_BUDGET", "1.0"))
+COLD_PREDICT_BUDGET = float(os.getenv("COLD_PREDICT_BUDGET", "1.5"))
+# must not be imported by the serving path
+COLD_FORBIDDEN = ("pandas", "bs4", "lxml", "requests", "full_roster_scraper")
+
+_COLD = """
+import time; t0 = time.perf_counter()
+import asyncio, json, sys
+sys.path.insert(0, {here!r})
+import app
+t1 = time.perf_counter()
+from bench import _asgi_get
+code = asyncio.run(_asgi_get(app.app, "/api/predict", "a=Fighter+0&b=Fighter+1"))
+t2 = time.perf_counter()
+print(json.dumps({{"import_s": t1 - t0, "first_predict_s": t2 - t0, "status": code,
+                  "loaded": [m for m in {forbidden!r} if m in sys.modules]}}))
+"""
+
+def bench_cold_start(tmp, n=5000, runs=3):
+    work = tmp / f"cold_{n}"
+    (work / "data").mkdir(parents=True)
+    _roster_csv(work / "data" / "roster.csv", n)
+    from roster_bin import build_from_csv
+    code = _COLD.format(here=str(HERE), forbidden=COLD_FORBIDDEN)
+    out = {}
+    for case in ("csv", "bin"):
+        if case == "bin":
+            build_from_csv(work / "data" / "roster.csv")
+        else:
+            (work / "data" / "roster.bin").unlink(missing_ok=True)
+        res = []
+        for _ in range(runs):
+            t = time.perf_counter()
+            p = subprocess.run([sys.executable, "-c", code], cwd=work, capture_output=True, text=True)
+            if p.returncode:
+                raise RuntimeError(f"cold start failed:\n{p.stderr}")
+            r = json.loads(p.stdout.strip().splitlines()[-1])
+            r["process_s"] = time.perf_counter() - t
+            res.append(r)
+            if case == "csv":
+                (work / "data" / "roster.bin").unlink(missing_ok=True)
+        out[case] = {k: float(np.median([r[k] for r in res])) for k in ("import_s", "first_predict_s", "process_s")}
+        out[case].update(status=res[-1]["status"], loaded=sorted({m for r in res for m in r["loaded"]}))
+    b = out["bin"]
+    out["budget"] = {"import_s": COLD_IMPORT_BUDGET, "first_predict_s": COLD_PREDICT_BUDGET,
+                     "ok": b["import_s"] <= COLD_IMPORT_BUDGET and b["first_predict_s"] <= COLD_PREDICT_BUDGET
+                           and b["status"] == 200 and not b["loaded"]}
+    return out
+
+# ---------- Runner ----------
+def _flatten(d, pre=""):
+    out = {}
+    for k, v in d.items():
+        if isinstance(v, dict): out.update(_flatten(v, f"{pre}{k}."))
+        elif isinstance(v, (int, float)) and not isinstance(v, bool): out[f"{pre}{k}"] = v
+    return out
+
+def compare(old, new):
+    a, b = _flatten(old["results"]), _flatten(new["results"])
+    for k in sorted(set(a) & set(b)):
+        if a[k]:
+            print(f"{k:60s} {a[k]:>14.4g} -> {b[k]:>14.4g}  ({b[k]/a[k]:.2f}x)")
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--sizes", default="1000,10000,100000")
+    ap.add_argument("--load-size", type=int, default=10000)
+    ap.add_argument("--requests", type=int, default=2000)
+    ap.add_argument("--concurrency", type=int, default=32)
+    ap.add_argument("--pages", default=str(HERE / "fixtures" / "profiles"),
+                    help="dir of saved UFCStats profile pages (default: fixtures; SAVE_HTML for more)")
+    ap.add_argument("--out", default="bench.json")
+    ap.add_argument("--compare", help="earlier bench.json to diff against")
+    ap.add_argument("--cold-start", action="store_true", help="only the startup budget check")
+    ap.add_argument("--cold-size", type=int, default=5000)
+    args = ap.parse_args()
+
+    tmp = Path(tempfile.mkdtemp(prefix="mma-bench-"))
+    os.environ.setdefault("MATRIX_CACHE", str(tmp / "matrix"))
+    if args.cold_start:
+        cold = bench_cold_start(tmp, args.cold_size)
+        print(json.dumps(cold, indent=2))
+        if not cold["budget"]["ok"]:
+            print("[warn] cold start over budget", file=sys.stderr)
+            sys.exit(1)
+        return
+    results = {"cold_start": bench_cold_start(tmp, args.cold_size)}
+    for n in [int(s) for s in args.sizes.split(",") if s]:
+        roster, load = bench_roster_load(tmp, n)
+        results[f"n={n}"] = {"roster_load": load, "predict_single": bench_predict(roster),
+                             "batch": bench_batch(roster), "all_pairs": bench_matrix(roster)}
+        print(f"[info] n={n} done", file=sys.stderr)
+    if args.pages:      # --pages "" skips it
+        results["parser"] = bench_parser(args.pages)
+    if args.load_size:
+        results["load"] = bench_load(tmp, args.load_size, args.requests, args.concurrency)
+
+    run = {"meta": {"time": time.time(), "python": platform.python_version(),
+                    "numpy": np.__version__, "machine": platform.machine(), "cpus": os.cpu_count()},
+           "results": results}
+    Path(args.out).write_text(json.dumps(run, indent=2))
+    print(json.dumps(results, indent=2))
+    if args.compare:
+        compare(json.loads(Path(args.compare).read_text()), run)
+
+if __name__ == "__main__":
+    main()
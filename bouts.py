@@ -0,0 +1,77 @@
+# bouts.py — per-bout fight history as a columnar dataset (data/bouts.npz)
+#
+# One row per (fighter, bout) as seen on that fighter's UFCStats page, so a
+# bout between two scraped fighters appears twice (see calibrate.matchups).
+# Names and events are dictionary-encoded; everything else is a flat array:
+#   names[U], events[U]          vocabularies
+#   fighter, opponent  int32     -> names
+#   event              int32     -> events
+#   result             int8      RESULTS index (L, W, D, NC)
+#   method             int8      METHODS index (KO, SUB, DEC, OTHER)
+#   round              int8      0 = unknown
+#   time_s             int16     elapsed time in the final round, -1 = unknown
+#   date               datetime64[D], NaT = unknown
+import os, sys
+from pathlib import Path
+
+import numpy as np
+
+RESULTS = ("L", "W", "D", "NC")
+METHODS = ("KO", "SUB", "DEC", "OTHER")
+
+def method_code(txt):
+    t = (txt or "").upper()
+    if "KO" in t: return 0                      # KO/TKO, TKO - Doctor's Stoppage
+    if "SUB" in t: return 1
+    if "DEC" in t: return 2                     # U-DEC, S-DEC, M-DEC
+    return 3                                    # DQ, Overturned, Could Not Continue, ...
+
+def _secs(t):
+    m, _, s = (t or "").partition(":")
+    return int(m) * 60 + int(s) if m.isdigit() and s.isdigit() else -1
+
+def to_columns(records):
+    # records: iterable of (fighter name, bout dict from the scraper's _bout)
+    names, events = {}, {}
+    code = lambda d, k: d.setdefault(k, len(d))
+    cols = {k: [] for k in ("fighter", "opponent", "event", "result", "method", "round", "time_s", "date")}
+    for fighter, b in records:
+        cols["fighter"].append(code(names, fighter))
+        cols["opponent"].append(code(names, b["opponent"]))
+        cols["event"].append(code(events, b.get("event", "")))
+        cols["result"].append(RESULTS.index(b["result"]))
+        cols["method"].append(method_code(b.get("method")))
+        cols["round"].append(b.get("round") or 0)
+        cols["time_s"].append(_secs(b.get("time")))
+        cols["date"].append(b.get("date") or "NaT")
+    out = {"names": np.array(list(names) or [""]), "events": np.array(list(events) or [""])}
+    for k, t in (("fighter", np.int32), ("opponent", np.int32), ("event", np.int32), ("result", np.int8),
+                 ("method", np.int8), ("round", np.int8), ("time_s", np.int16), ("date", "datetime64[D]")):
+        out[k] = np.array(cols[k], dtype=t)
+    return out
+
+def write(cols, path: Path):
+    path = Path(path)
+    tmp = path.with_name(path.name + ".tmp")
+    with open(tmp, "wb") as f:
+        np.savez(f, **cols)
+        f.flush(); os.fsync(f.fileno())
+    os.replace(tmp, path)
+    return path
+
+def load(path: Path):
+    with np.load(path, allow_pickle=False) as z:
+        return {k: z[k] for k in z.files}
+
+def summary(cols):
+    n = len(cols["fighter"])
+    d = cols["date"][~np.isnat(cols["date"])]
+    return {"rows": n, "fighters": int(len(np.unique(cols["fighter"]))) if n else 0,
+            "results": {r: int((cols["result"] == k).sum()) for k, r in enumerate(RESULTS)},
+            "methods": {m: int((cols["method"] == k).sum()) for k, m in enumerate(METHODS)},
+            "first": str(d.min()) if len(d) else None, "last": str(d.max()) if len(d) else None}
+
+if __name__ == "__main__":
+    # python bouts.py [data/bouts.npz]
+    import json
+    print(json.dumps(summary(load(Path(sys.argv[1] if len(sys.argv) > 1 else "data/bouts.npz"))), indent=2))
@@ -0,0 +1,224 @@
+# calibrate.py — backtest and refit the model on historical bouts
+#
+#   python calibrate.py [data/roster.csv] [data/bouts.npz] [--holdout 0.2] [--by COL] [--l2 10] [--out weights.json]
+#
+# Each step is one vectorized pass: the roster becomes a raw metric matrix,
+# bouts become (ia, ib, y, method) row-index arrays, and predictions are row
+# gathers through the same linear/softmax forms as model.py.
+#   * benchmarks: DIV_BENCH mu/sd recomputed from the roster (per group with --by)
+#   * win model:  P(A) = sigmoid(scale * (Z_A - Z_B) @ W_R). scale (1.35*0.80 in
+#     model.py) is fit first with W_R fixed, then W_R by ridge logistic
+#     regression shrunk toward the hand-tuned weights
+#   * methods:    softmax(C_ETA + Z_win @ W_OWN + Z_lose @ W_OPP) over KO/SUB/DEC,
+#     fit with the same ridge toward the current coefficients
+# Bouts after the holdout date cut are only scored, never fit.
+# Caveat: fighters carry their current career stats, not their stats on fight
+# night, so absolute scores are optimistic; compare the fits to each other.
+import argparse, json, sys, time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+import bouts
+import roster_bin
+from model import C_ETA, METRICS, W_OPP, W_OWN, W_R, _MU, _SD, _softmax
+from name_index import NameIndex
+
+SCALE = 1.35 * 0.80
+MIN_N = 20            # fewer roster values than this -> keep the DIV_BENCH prior
+
+# ---------- Data ----------
+def raw_matrix(table):
+    # roster_bin.Table -> float64 [fighters x METRICS], NaN where missing
+    X = np.full((len(table), len(METRICS)), np.nan)
+    for j, m in enumerate(METRICS):
+        col = table.column(m)
+        if col is not None: X[:, j] = col
+    return X
+
+def benchmarks(X, groups=None, min_n=MIN_N):
+    # -> per-row mu, sd [fighters x METRICS] and {group: {metric: [mu, sd, n]}}
+    mu, sd = np.tile(_MU, (len(X), 1)), np.tile(_SD, (len(X), 1))
+    keys = np.zeros(len(X), dtype=int) if groups is None else pd.factorize(groups)[0]
+    labels = ["all"] if groups is None else list(pd.unique(groups))
+    out = {}
+    for g, label in enumerate(labels):
+        rows = keys == g
+        Xg = X[rows]
+        ok = ~np.isnan(Xg)
+        n = ok.sum(axis=0)
+        m = np.where(ok, Xg, 0).sum(axis=0) / np.maximum(n, 1)
+        s = np.sqrt(np.where(ok, (Xg - m) ** 2, 0).sum(axis=0) / np.maximum(n, 1))
+        use = (n >= min_n) & (s > 1e-6)
+        mu[rows] = np.where(use, m, _MU)
+        sd[rows] = np.where(use, s, _SD)
+        out[str(label)] = {k: [round(float(mu[rows][0, j]), 4), round(float(sd[rows][0, j]), 4), int(n[j])]
+                           for j, k in enumerate(METRICS)} if rows.any() else {}
+    return mu, sd, out
+
+def zscore(X, mu, sd):
+    # serving semantics: missing value -> 0 before scaling (see zmatrix_table)
+    return np.clip((np.nan_to_num(X, nan=0.0) - mu) / sd, -3.0, 3.0)
+
+def matchups(bt, index):
+    # One row per distinct decided bout between two roster fighters. A is the
+    # fighter whose page the bout was read from; a bout seen from both pages
+    # (same pair and date) is kept once.
+    rows = np.array([-1 if (r := index.lookup(n)) is None else r for n in bt["names"]], dtype=np.int64)
+    ia, ib = rows[bt["fighter"]], rows[bt["opponent"]]
+    keep = (ia >= 0) & (ib >= 0) & (ia != ib) & (bt["result"] <= 1)
+    key = np.stack([np.minimum(ia, ib), np.maximum(ia, ib), bt["date"].astype(np.int64)], axis=1)[keep]
+    _, first = np.unique(key, axis=0, return_index=True)
+    sel = np.flatnonzero(keep)[np.sort(first)]
+    return {"ia": ia[sel], "ib": ib[sel], "y": (bt["result"][sel] == 1).astype(float),
+            "method": bt["method"][sel], "date": bt["date"][sel]}
+
+def _take(m, mask):
+    return {k: v[mask] for k, v in m.items()}
+
+def split(m, holdout=0.2):
+    # time-ordered: the latest `holdout` share of dated bouts is the test set
+    d = m["date"]
+    dated = ~np.isnat(d)
+    if not holdout or not dated.any():
+        return m, _take(m, np.zeros(len(d), bool)), None
+    cut = np.sort(d[dated])[int(dated.sum() * (1 - holdout))] if holdout < 1 else d[dated].min()
+    test = dated & (d >= cut)
+    return _take(m, ~test), _take(m, test), str(cut)
+
+# ---------- Model ----------
+def current():
+    return {"scale": SCALE, "w_r": W_R.copy(), "c_eta": C_ETA.copy(), "w_own": W_OWN.copy(), "w_opp": W_OPP.copy()}
+
+def _sigmoid(x):
+    return 1 / (1 + np.exp(-x))
+
+def win_prob(p, ZA, ZB):
+    return _sigmoid(p["scale"] * ((ZA - ZB) @ p["w_r"]))
+
+def method_probs(p, Zw, Zl):
+    # KO/SUB/DEC for the winner
+    return _softmax(p["c_eta"] + Zw @ p["w_own"] + Zl @ p["w_opp"])
+
+def _sides(Z, m):
+    ZA, ZB = Z[m["ia"]], Z[m["ib"]]
+    won = m["y"][:, None] == 1
+    return ZA, ZB, np.where(won, ZA, ZB), np.where(won, ZB, ZA)
+
+def evaluate(p, Z, m):
+    out = {"bouts": int(len(m["y"]))}
+    if not len(m["y"]): return out
+    ZA, ZB, Zw, Zl = _sides(Z, m)
+    y = m["y"]
+    P = np.clip(win_prob(p, ZA, ZB), 1e-12, 1 - 1e-12)
+    out.update(log_loss=float(-np.mean(y * np.log(P) + (1 - y) * np.log(1 - P))),
+               brier=float(np.mean((P - y) ** 2)), accuracy=float(np.mean((P > 0.5) == (y == 1))))
+    fin = m["method"] < 3
+    if fin.any():
+        q = np.clip(method_probs(p, Zw[fin], Zl[fin]), 1e-12, 1)
+        Y = np.eye(3)[m["method"][fin]]
+        out.update(method_bouts=int(fin.sum()), method_log_loss=float(-np.mean(np.log((q * Y).sum(axis=1)))),
+                   method_brier=float(np.mean(((q - Y) ** 2).sum(axis=1))))
+    return out
+
+# ---------- Fitting (Newton; problems are tiny once vectorized) ----------
+def _newton_logistic(X, y, b0, lam, iters=50):
+    b = b0.copy()
+    for _ in range(iters):
+        P = _sigmoid(X @ b)
+        g = X.T @ (P - y) + lam * (b - b0)
+        H = (X * (P * (1 - P))[:, None]).T @ X + lam * np.eye(len(b))
+        step = np.linalg.solve(H, g)
+        b -= step
+        if np.abs(step).max() < 1e-9: break
+    return b
+
+def _newton_softmax(X, Y, T0, lam, iters=50):
+    # X [n x d], Y one-hot [n x K], T0 [d x K] prior; lam [d] ridge per row of T
+    d, K = T0.shape
+    T = T0.copy()
+    for _ in range(iters):
+        P = _softmax(X @ T)
+        G = X.T @ (P - Y) + lam[:, None] * (T - T0)
+        H = np.empty((d * K, d * K))
+        for k in range(K):
+            for l in range(K):
+                w = P[:, k] * ((k == l) - P[:, l])
+                H[k*d:(k+1)*d, l*d:(l+1)*d] = (X * w[:, None]).T @ X
+        H += np.diag(np.tile(lam, K))
+        step = np.linalg.solve(H, G.T.reshape(-1)).reshape(K, d).T
+        T -= step
+        if np.abs(step).max() < 1e-9: break
+    return T
+
+def fit_scale(p, Z, m):
+    ZA, ZB, _, _ = _sides(Z, m)
+    x = ((ZA - ZB) @ p["w_r"])[:, None]
+    s = _newton_logistic(x, m["y"], np.array([p["scale"]]), 1e-6)[0]
+    return {**p, "scale": float(s)}
+
+def fit_win(p, Z, m, l2):
+    ZA, ZB, _, _ = _sides(Z, m)
+    b = _newton_logistic(ZA - ZB, m["y"], p["scale"] * p["w_r"], l2)
+    return {**p, "w_r": b / p["scale"]}
+
+def fit_methods(p, Z, m, l2):
+    _, _, Zw, Zl = _sides(Z, m)
+    fin = m["method"] < 3
+    X = np.hstack([np.ones((fin.sum(), 1)), Zw[fin], Zl[fin]])
+    T0 = np.vstack([p["c_eta"], p["w_own"], p["w_opp"]])
+    lam = np.r_[1e-3, np.full(2 * len(METRICS), l2)]      # intercepts nearly free
+    T = _newton_softmax(X, np.eye(3)[m["method"][fin]], T0, lam)
+    n = len(METRICS)
+    return {**p, "c_eta": T[0], "w_own": T[1:1+n], "w_opp": T[1+n:]}
+
+# ---------- Backtest ----------
+def run(table, bt, holdout=0.2, groups=None, l2=10.0):
+    t0 = time.perf_counter()
+    X = raw_matrix(table)
+    mu, sd, bench = benchmarks(X, groups)
+    m = matchups(bt, NameIndex(table.strings.get("Name", [""] * len(table))))
+    train, test, cut = split(m, holdout)
+    Z_old, Z_new = zscore(X, _MU, _SD), zscore(X, mu, sd)
+
+    base = current()
+    fits = {"current": (base, Z_old), "benchmarks": (base, Z_new)}
+    p = fit_scale(base, Z_new, train)
+    fits["scale"] = (p, Z_new)
+    if len(train["y"]):
+        p = fit_methods(fit_win(p, Z_new, train, l2), Z_new, train, l2)
+    fits["full"] = (p, Z_new)
+
+    report = {"bouts": {"rows": int(len(bt["fighter"])), "matched": int(len(m["y"])),
+                        "train": int(len(train["y"])), "test": int(len(test["y"])), "test_from": cut},
+              "fits": {k: {"scale": f["scale"], "train": evaluate(f, Z, train), "test": evaluate(f, Z, test)}
+                       for k, (f, Z) in fits.items()},
+              "benchmarks": bench}
+    report["seconds"] = round(time.perf_counter() - t0, 3)
+    return report, p
+
+def weights_json(p, bench):
+    return {"scale": p["scale"], "div_bench": bench,
+            "w_r": dict(zip(METRICS, np.round(p["w_r"], 5).tolist())),
+            "c_eta": dict(zip(("KO", "SUB", "DEC"), np.round(p["c_eta"], 5).tolist())),
+            "w_own": dict(zip(METRICS, np.round(p["w_own"], 5).tolist())),
+            "w_opp": dict(zip(METRICS, np.round(p["w_opp"], 5).tolist()))}
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser()
+    ap.add_argument("roster", nargs="?", default="data/roster.csv")
+    ap.add_argument("bouts", nargs="?", default="data/bouts.npz")
+    ap.add_argument("--holdout", type=float, default=0.2, help="latest share of bouts kept for testing")
+    ap.add_argument("--by", help="roster column to compute benchmarks per group (e.g. a division column)")
+    ap.add_argument("--l2", type=float, default=10.0, help="ridge strength toward the current weights")
+    ap.add_argument("--out", help="write fitted weights + benchmarks as JSON")
+    args = ap.parse_args()
+
+    df = pd.read_csv(args.roster)
+    groups = df[args.by].astype(str).to_numpy() if args.by else None
+    report, p = run(roster_bin.from_frame(df), bouts.load(Path(args.bouts)), args.holdout, groups, args.l2)
+    if args.out:
+        Path(args.out).write_text(json.dumps(weights_json(p, report["benchmarks"]), indent=2))
+        print(f"[ok] wrote {args.out}", file=sys.stderr)
+    print(json.dumps({k: v for k, v in report.items() if k != "benchmarks"}, indent=2))
@@ -1,11 +1,22 @@
 # full_roster_scraper.py — builds data/roster.csv from UFCStats
 
-import re, time, csv, sys, os
+import re, time, csv, sys, os, threading, json, hashlib, sqlite3
+from collections import Counter, deque
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
 from pathlib import Path
 from datetime import datetime, timezone
+from urllib.parse import urlsplit
 
 import requests
+from requests.adapters import HTTPAdapter
 from bs4 import BeautifulSoup
+try:
+    from lxml import html as lxml_html
+except ImportError:          # bs4-only installs fall back to the BeautifulSoup parser
+    lxml_html = None
+
+from metrics import timer
 
 # ---------- Config ----------
 BASE = "http://ufcstats.com"
@@ -18,6 +29,21 @@ LETTERS = os.getenv("LETTERS")
 ACTIVE_YEARS = float(os.getenv("ACTIVE_YEARS", "3"))
 MIN_BOUTS    = int(os.getenv("MIN_BOUTS", "1"))
 
+# Politeness: global requests/sec across all workers + max in-flight per host
+RPS      = float(os.getenv("RPS", "3"))
+WORKERS  = int(os.getenv("WORKERS", "6"))
+PER_HOST = int(os.getenv("PER_HOST", "4"))
+
+# Incremental mode: reuse cached profiles unless stale or the fighter's listing row changed
+INCREMENTAL    = os.getenv("INCREMENTAL", "0") == "1"
+SCRAPE_CACHE   = Path(os.getenv("SCRAPE_CACHE", "data/.cache/profiles.sqlite3"))
+CACHE_TTL_DAYS = float(os.getenv("CACHE_TTL_DAYS", "7"))
+
+PARSER    = os.getenv("PARSER", "lxml")         # "lxml" (XPath, single pass) or "bs4"
+SAVE_HTML = os.getenv("SAVE_HTML")              # dir to keep raw profile pages (parser fixtures)
+
+RESUME_MAX_HOURS = float(os.getenv("RESUME_MAX_HOURS", "24"))   # older checkpoint journals are ignored
+
 BASE_COLS = [
     "Name","Age","Height_in","Reach_in","Stance",
     "SSLpm","SSApm","Acc","Def","KDpm",
@@ -38,14 +64,63 @@ def default_stat_block():
 # build final column list (defaults union base)
 COLS = BASE_COLS + [k for k in default_stat_block().keys() if k not in BASE_COLS]
 
+# ---------- Counters ----------
+COUNTERS = Counter()        # process-wide: pages_fetched, bytes_fetched, retries, fetch_errors, parse_errors, ...
+_counter_lock = threading.Lock()
+
+def _inc(key, n=1):
+    with _counter_lock:
+        COUNTERS[key] += n
+
 # ---------- HTTP ----------
+class TokenBucket:
+    def __init__(self, rate, burst=1):
+        self.rate, self.burst = rate, burst
+        self.tokens, self.t = float(burst), time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        if self.rate <= 0: return
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.burst, self.tokens + (now - self.t) * self.rate)
+                self.t = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) / self.rate
+            time.sleep(wait)
+
+BUCKET = TokenBucket(RPS)
+_host_sems, _host_lock = {}, threading.Lock()
+
+@contextmanager
+def _host_slot(url):
+    host = urlsplit(url).netloc
+    with _host_lock:
+        sem = _host_sems.setdefault(host, threading.BoundedSemaphore(PER_HOST))
+    with sem:
+        yield
+
+SESSION = requests.Session()
+SESSION.headers.update(HEADERS)
+SESSION.mount("http://",  HTTPAdapter(pool_connections=4, pool_maxsize=max(WORKERS, PER_HOST)))
+SESSION.mount("https://", HTTPAdapter(pool_connections=4, pool_maxsize=max(WORKERS, PER_HOST)))
+
 def _get(url, to=25):
     last_exc = None
-    for _ in range(3):
+    for attempt in range(3):
+        if attempt: _inc("retries")
         try:
-            r = requests.get(url, headers=HEADERS, timeout=to, allow_redirects=True)
+            with _host_slot(url):
+                BUCKET.acquire()
+                with timer("fetch"):
+                    r = SESSION.get(url, timeout=to, allow_redirects=True)
+            _inc("pages_fetched"); _inc("bytes_fetched", len(r.content))
             if r.status_code == 200 and len(r.text) > 1000:
                 return r.text
+            _inc("bad_responses")
         except Exception as e:
             last_exc = e
         time.sleep(0.8)
@@ -62,33 +137,159 @@ def _parse_date(txt):
             pass
     return None
 
-def iter_roster_urls():
+def _is_active(row):
+    is_active = True
+    try:
+        if row.get("LastFightDate"):
+            last_dt = datetime.fromisoformat(row["LastFightDate"])
+            years = (datetime.now(timezone.utc) - last_dt).days / 365.25
+            if years > ACTIVE_YEARS:
+                is_active = False
+        else:
+            is_active = False
+
+        if int(row.get("BoutCount", 0)) < MIN_BOUTS:
+            is_active = False
+    except Exception:
+        pass
+    return is_active
+
+def roster_letters():
     if LETTERS:
-        letters = list(LETTERS)
-    elif QUICK:
-        letters = list("ab")
-    else:
-        letters = list("abcdefghijklmnopqrstuvwxyz") + ["other"]
-
-    for c in letters:
-        url = f"{BASE}/statistics/fighters?char={c}&page=all"
-        try:
-            soup = BeautifulSoup(_get(url), "lxml")
-            for a in soup.select("td a[href*='fighter-details']"):
-                name = a.get_text(strip=True)
-                href = a.get("href", "")
-                if href:
-                    yield name, href
-            print(f"[info] roster page {c}: ok", file=sys.stderr)
-        except Exception as e:
-            print(f"[warn] roster page {c}: {e}", file=sys.stderr)
-        time.sleep(0.4)
+        return list(LETTERS)
+    if QUICK:
+        return list("ab")
+    return list("abcdefghijklmnopqrstuvwxyz") + ["other"]
+
+def letter_entries(c):
+    # [(name, href, listing)] for one roster page; raises if the page can't be fetched.
+    # listing is the fighter's row on the roster page (record, weight, belt...),
+    # which changes whenever they have a new bout.
+    soup = BeautifulSoup(_get(f"{BASE}/statistics/fighters?char={c}&page=all"), "lxml")
+    out = []
+    for a in soup.select("td a[href*='fighter-details']"):
+        name = a.get_text(strip=True)
+        href = a.get("href", "")
+        if href:
+            tr = a.find_parent("tr")
+            listing = " | ".join(td.get_text(" ", strip=True) for td in tr.select("td")) if tr else ""
+            out.append((name, href, listing))
+    return out
 
 # ---------- Parse one profile ----------
+# Bump when parsing changes what a page yields; cached rows from older parsers are re-parsed
+PARSE_VERSION = 2
+
+def _blank_profile():
+    return {"Height_in":"", "Reach_in":"", "Stance":"", "Age":"", "LastFightDate":"", "BoutCount":0,
+            "Parsed": PARSE_VERSION}
+
 def parse_profile(url):
-    dat = {"Height_in":"", "Reach_in":"", "Stance":"", "Age":"", "LastFightDate":"", "BoutCount":0}
     try:
         html = _get(url)
+    except Exception as e:
+        _inc("fetch_errors")
+        print(f"[warn] profile parse: {url}: {e}", file=sys.stderr)
+        return _blank_profile()
+    return parse_profile_html(html, url)
+
+def parse_profile_html(html, url=""):
+    with timer("parse"):
+        if PARSER == "lxml" and lxml_html is not None:
+            try:
+                return parse_profile_lxml(html, url)
+            except Exception as e:
+                _inc("lxml_fallbacks")
+                print(f"[warn] lxml parse failed, falling back to bs4: {url}: {e}", file=sys.stderr)
+        return parse_profile_bs4(html, url)
+
+# Shared by both backends so they read text identically
+_RX_HEIGHT = re.compile(r"(\d+)\s*'\s*(\d+)")
+_RX_REACH  = re.compile(r"(\d+)\s*(?:\"|in)")
+_RX_NUM    = re.compile(r":\s*([-+]?\d+(?:\.\d+)?)")
+_RX_PCT    = re.compile(r"(\d+)\s*%")
+_RX_YEAR   = re.compile(r"\d{4}")     # every format _parse_date accepts has a 4-digit year
+
+# (column, label substrings, is-percent) in the order the labels are tested
+_STATS = [
+    ("SSLpm", ("SLpM",), False), ("SSApm", ("SApM",), False),
+    ("Acc", ("Str. Acc.",), True), ("Def", ("Str. Def",), True),
+    ("KDpm", ("KD Avg.", "Knockdown Avg."), False), ("TD15", ("TD Avg.",), False),
+    ("TDAcc", ("TD Acc.",), True), ("TDD", ("TD Def.",), True), ("Sub15", ("Sub. Avg.",), False),
+]
+
+# Right box: stats (try multiple list variants, first hit per stat wins)
+STATS_SELECTORS = [
+    "div.b-list__info-box.b-list__info-box--right ul.b-list__box-list li",
+    "ul.b-list__box-list.b-list__box-list--style-none li",
+    "ul.b-list__box-list.b-list__box-list--border-top li",
+    "ul.b-list__box-list--right li",
+    "ul.b-list__box-list li",
+]
+
+def _read_phys(t, dat):
+    # Left box: physicals / stance
+    if "Height" in t:
+        m = _RX_HEIGHT.findall(t)
+        if m:
+            dat["Height_in"] = int(m[0][0]) * 12 + int(m[0][1])
+    if "Reach" in t:
+        m = _RX_REACH.findall(t.lower())
+        if m:
+            dat["Reach_in"] = float(m[0])
+    if "STANCE" in t.upper():
+        dat["Stance"] = t.split(":")[-1].strip()
+
+def _read_stat(t, dat, got):
+    for key, labels, pct in _STATS:
+        if key not in got and any(l in t for l in labels):
+            m = (_RX_PCT if pct else _RX_NUM).search(t)
+            if m:
+                dat[key] = int(m.group(1))/100.0 if pct else float(m.group(1))
+                got.add(key)
+            return
+
+_RESULTS = {"win": "W", "loss": "L", "draw": "D", "nc": "NC"}
+
+def _bout(cells):
+    # One completed bout from the standard 10-column history row:
+    # W/L | fighter, opponent | KD | STR | TD | SUB | event, date | method, detail | round | time
+    if len(cells) < 10: return None
+    res = _RESULTS.get(cells[0][0].lower())
+    names, event, method = ([t for t in cells[k][1] if t] for k in (1, 6, 7))
+    if res is None or len(names) < 2: return None
+    dt = next((d for d in map(_parse_date, event[1:]) if d), None)
+    return {"opponent": names[1], "result": res,
+            "method": method[0] if method else "", "detail": " ".join(method[1:]),
+            "round": int(cells[8][0]) if cells[8][0].isdigit() else 0, "time": cells[9][0],
+            "date": dt.date().isoformat() if dt else "", "event": event[0] if event else ""}
+
+def _read_history(rows, dat):
+    # rows: per table row, a list of (cell text, [paragraph texts]).
+    # Last fight date + bout count, and the completed bouts as dat["Bouts"].
+    last_dt = None
+    bouts = 0
+    dat["Bouts"] = []
+    for cells in rows:
+        if cells and cells[0][0].lower() == "next":
+            continue      # scheduled bout: not fought yet
+        for c, paras in reversed(cells):
+            # the date shares its cell with the event name; try each paragraph too
+            dt = next((d for d in map(_parse_date, [c, *paras]) if d), None) if _RX_YEAR.search(c) else None
+            if dt:
+                bouts += 1
+                if (last_dt is None) or (dt > last_dt):
+                    last_dt = dt
+                break
+        b = _bout(cells)
+        if b: dat["Bouts"].append(b)
+    if last_dt:
+        dat["LastFightDate"] = last_dt.isoformat()
+    dat["BoutCount"] = bouts
+
+def parse_profile_bs4(html, url=""):
+    dat = _blank_profile()
+    try:
         soup = BeautifulSoup(html, "lxml")
 
         # Title for debug
@@ -97,149 +298,358 @@ def parse_profile(url):
         name = soup.select_one("span.b-content__title-highlight")
         dat["Name"] = name.get_text(strip=True) if name else ""
 
-        # Left box: physicals / stance
         for li in soup.select("ul.b-list__box-list li"):
-            t = li.get_text(" ", strip=True)
-
-            if "Height" in t:
-                m = re.findall(r"(\d+)\s*'\s*(\d+)", t)
-                if m:
-                    dat["Height_in"] = int(m[0][0]) * 12 + int(m[0][1])
-
-            if "Reach" in t:
-                m = re.findall(r"(\d+)\s*(?:\"|in)", t.lower())
-                if m:
-                    dat["Reach_in"] = float(m[0])
-
-            if "STANCE" in t.upper():
-                dat["Stance"] = t.split(":")[-1].strip()
-
-        # Right box: stats (try multiple list variants)
-        stats_selectors = [
-            "div.b-list__info-box.b-list__info-box--right ul.b-list__box-list li",
-            "ul.b-list__box-list.b-list__box-list--style-none li",
-            "ul.b-list__box-list.b-list__box-list--border-top li",
-            "ul.b-list__box-list--right li",
-            "ul.b-list__box-list li",
-        ]
-
-        def num_after(colon_text):
-            m = re.search(r":\s*([-+]?\d+(?:\.\d+)?)", colon_text)
-            return float(m.group(1)) if m else None
+            _read_phys(li.get_text(" ", strip=True), dat)
 
         got = set()
-        for sel in stats_selectors:
+        for sel in STATS_SELECTORS:
             items = soup.select(sel)
             if not items:
                 continue
             for li in items:
-                t = li.get_text(" ", strip=True)
-
-                if "SLpM" in t and "SSLpm" not in got:
-                    v = num_after(t)
-                    if v is not None: dat["SSLpm"] = v; got.add("SSLpm")
-
-                elif "SApM" in t and "SSApm" not in got:
-                    v = num_after(t)
-                    if v is not None: dat["SSApm"] = v; got.add("SSApm")
-
-                elif "Str. Acc." in t and "Acc" not in got:
-                    m = re.search(r"(\d+)\s*%", t)
-                    if m: dat["Acc"] = int(m.group(1))/100.0; got.add("Acc")
-
-                elif "Str. Def." in t and "Def" not in got:
-                    m = re.search(r"(\d+)\s*%", t)
-                    if m: dat["Def"] = int(m.group(1))/100.0; got.add("Def")
-
-                elif ("KD Avg." in t or "Knockdown Avg." in t) and "KDpm" not in got:
-                    v = num_after(t)
-                    if v is not None: dat["KDpm"] = v; got.add("KDpm")
-
-                elif "TD Avg." in t and "TD15" not in got:
-                    v = num_after(t)
-                    if v is not None: dat["TD15"] = v; got.add("TD15")
-
-                elif "TD Acc." in t and "TDAcc" not in got:
-                    m = re.search(r"(\d+)\s*%", t)
-                    if m: dat["TDAcc"] = int(m.group(1))/100.0; got.add("TDAcc")
-
-                elif "TD Def." in t and "TDD" not in got:
-                    m = re.search(r"(\d+)\s*%", t)
-                    if m: dat["TDD"] = int(m.group(1))/100.0; got.add("TDD")
-
-                elif "Sub. Avg." in t and "Sub15" not in got:
-                    v = num_after(t)
-                    if v is not None: dat["Sub15"] = v; got.add("Sub15")
-
+                _read_stat(li.get_text(" ", strip=True), dat, got)
             if len(got) >= 7:
                 break
 
         if not got:
             print(f"[warn] no stats list for {dat.get('Name','?')} | {title} | {url}", file=sys.stderr)
 
-        # Fight history: last fight date + bout count
-        last_dt = None
-        bouts = 0
-        for row in soup.select("table.b-fight-details__table tbody tr"):
-            cells = [c.get_text(" ", strip=True) for c in row.select("td")]
-            for c in reversed(cells):
-                dt = _parse_date(c)
-                if dt:
-                    bouts += 1
-                    if (last_dt is None) or (dt > last_dt):
-                        last_dt = dt
-                    break
-        if last_dt:
-            dat["LastFightDate"] = last_dt.isoformat()
-        dat["BoutCount"] = bouts
+        _read_history([[(c.get_text(" ", strip=True), [p.get_text(" ", strip=True) for p in c.select("p")])
+                        for c in row.select("td")]
+                       for row in soup.select("table.b-fight-details__table tbody tr")], dat)
 
         print(f"[debug] parsed {dat.get('Name','?')} | got={sorted(list(got))}", file=sys.stderr)
 
     except Exception as e:
+        _inc("parse_errors")
         print(f"[warn] profile parse: {url}: {e}", file=sys.stderr)
 
     return dat
 
+def _cls(*names):
+    return " and ".join(f"contains(concat(' ', normalize-space(@class), ' '), ' {n} ')" for n in names)
+
+_X_NAME    = f"//span[{_cls('b-content__title-highlight')}]"
+_X_LIS     = "//ul[contains(@class, 'b-list__box-list')]//li"
+_X_HISTORY = f"//table[{_cls('b-fight-details__table')}]//tbody//tr"
+
+def _lx_text(el, sep=" "):
+    # same as bs4 get_text(sep, strip=True)
+    return sep.join(s for s in (x.strip() for x in el.itertext()) if s)
+
+def _selector_hits(li):
+    # Which of STATS_SELECTORS match this li, from one walk up its ancestors.
+    hits = [False] * 5
+    seen_box_ul = False
+    for anc in li.iterancestors():
+        cls = (anc.get("class") or "").split()
+        if anc.tag == "ul":
+            if "b-list__box-list" in cls:
+                seen_box_ul = hits[4] = True
+                if "b-list__box-list--style-none" in cls: hits[1] = True
+                if "b-list__box-list--border-top" in cls: hits[2] = True
+            if "b-list__box-list--right" in cls: hits[3] = True
+        elif anc.tag == "div" and seen_box_ul and "b-list__info-box" in cls and "b-list__info-box--right" in cls:
+            hits[0] = True
+    return hits
+
+def parse_profile_lxml(html, url=""):
+    # Single pass over the tree with XPath; text and selector membership of every
+    # box-list li is computed once, then STATS_SELECTORS precedence is replayed.
+    dat = _blank_profile()
+    doc = lxml_html.fromstring(html)
+    title = doc.xpath("string(//title)").strip() or "no-title"
+    name = doc.xpath(_X_NAME)
+    dat["Name"] = _lx_text(name[0], "") if name else ""
+
+    lis = [(_lx_text(li), _selector_hits(li)) for li in doc.xpath(_X_LIS)]
+    for t, hits in lis:
+        if hits[4]:
+            _read_phys(t, dat)
+
+    got = set()
+    for k in range(len(STATS_SELECTORS)):
+        items = [t for t, hits in lis if hits[k]]
+        if not items:
+            continue
+        for t in items:
+            _read_stat(t, dat, got)
+        if len(got) >= 7:
+            break
+
+    if not got:
+        print(f"[warn] no stats list for {dat.get('Name','?')} | {title} | {url}", file=sys.stderr)
+
+    _read_history([[(_lx_text(c), [_lx_text(p) for p in c.iter("p")]) for c in row.iter("td")]
+                   for row in doc.xpath(_X_HISTORY)], dat)
+
+    print(f"[debug] parsed {dat.get('Name','?')} | got={sorted(list(got))}", file=sys.stderr)
+    return dat
+
+# ---------- Profile cache ----------
+class ProfileCache:
+    # url -> parsed row, listing signature, html hash, fetch time (SQLite, shared by workers)
+    def __init__(self, path: Path):
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self.db = sqlite3.connect(str(path), check_same_thread=False)
+        self.lock = threading.Lock()
+        with self.lock, self.db:
+            self.db.execute("CREATE TABLE IF NOT EXISTS profiles (url TEXT PRIMARY KEY, row TEXT, "
+                            "listing TEXT, sha TEXT, fetched REAL)")
+
+    def get(self, url):
+        with self.lock:
+            r = self.db.execute("SELECT row, listing, sha, fetched FROM profiles WHERE url=?", (url,)).fetchone()
+        if not r: return None
+        return {"row": json.loads(r[0]), "listing": r[1], "sha": r[2], "fetched": r[3]}
+
+    def put(self, url, row, listing, sha):
+        with self.lock, self.db:
+            self.db.execute("INSERT OR REPLACE INTO profiles VALUES (?,?,?,?,?)",
+                            (url, json.dumps(row), listing, sha, time.time()))
+
+    def fresh(self, url, listing):
+        # cached row if it can be reused without a fetch, else None
+        c = self.get(url)
+        if not c or c["listing"] != listing:
+            return None
+        if not _is_active(c["row"]):
+            return c["row"]      # retired: ACTIVE_YEARS drops it anyway, and no new bout since
+        if (time.time() - c["fetched"]) / 86400 < CACHE_TTL_DAYS:
+            return c["row"]
+        return None
+
+    def close(self):
+        self.db.close()
+
+def fetch_profile(url, listing="", cache=None):
+    # fetch + parse, skipping the parse when the page is byte-identical to the cached one
+    try:
+        html = _get(url)
+    except Exception as e:
+        _inc("fetch_errors")
+        print(f"[warn] profile parse: {url}: {e}", file=sys.stderr)
+        c = cache.get(url) if cache else None
+        return c["row"] if c else _blank_profile()
+    sha = hashlib.sha1(html.encode("utf-8")).hexdigest()
+    if SAVE_HTML:
+        d = Path(SAVE_HTML); d.mkdir(parents=True, exist_ok=True)
+        (d / (url.rstrip("/").rsplit("/", 1)[-1] + ".html")).write_text(html, encoding="utf-8")
+    c = cache.get(url) if cache else None
+    row = c["row"] if c and c["sha"] == sha and c["row"].get("Parsed") == PARSE_VERSION else parse_profile_html(html, url)
+    if cache:
+        cache.put(url, row, listing, sha)
+    return row
+
 # ---------- Build roster ----------
-def build_roster(out_csv: Path):
+def scrape_one(name, url, listing="", cache=None, incremental=False):
+    # fetch + parse + active filter; returns the output row or None
+    # (rows cached by an older parser count as stale)
+    row = cache.fresh(url, listing) if (cache and incremental) else None
+    if row is None or row.get("Parsed") != PARSE_VERSION:
+        row = fetch_profile(url, listing, cache)
+    row = dict(row)
+    if not row.get("Name"):
+        row["Name"] = name
+    if not _is_active(row):
+        return None
+    # Merge defaults first, then real values override
+    row = {**default_stat_block(), **row}
+    return {**{k: row.get(k, "") for k in COLS}, "Bouts": row.get("Bouts", [])}
+
+class Checkpoint:
+    # Append-only JSONL journal next to the output: one line per processed fighter
+    # (letter, position, url, row-or-null) and one per finished letter. Lines are
+    # flushed as written and fsynced in batches; a torn last line is ignored.
+    def __init__(self, path: Path, letters):
+        self.path = path
+        self.rows, self.done = {}, set()
+        head = {"cols": COLS, "letters": letters, "active_years": ACTIVE_YEARS, "min_bouts": MIN_BOUTS}
+        self._unsynced = 0
+        valid = self._load(head) if self._fresh() else None
+        if valid:
+            n = sum(len(v) for v in self.rows.values())
+            print(f"[info] resuming from {path}: {len(self.done)} letters, {n} fighters done", file=sys.stderr)
+        else:
+            self.rows, self.done, valid = {}, set(), [json.dumps(head)]
+        # rewrite the intact prefix so a torn last line can't swallow new entries
+        self.f = path.open("w", encoding="utf-8")
+        self.f.write("\n".join(valid) + "\n")
+        self.f.flush()
+
+    def _fresh(self):
+        return self.path.exists() and (time.time() - self.path.stat().st_mtime) / 3600 < RESUME_MAX_HOURS
+
+    def _load(self, head):
+        # returns the intact journal lines, or None if it belongs to another config
+        lines = self.path.read_text(encoding="utf-8").splitlines()
+        try:
+            if json.loads(lines[0]) != json.loads(json.dumps(head)): return None
+        except (IndexError, ValueError):
+            return None
+        for k, ln in enumerate(lines[1:], 1):
+            try: e = json.loads(ln)
+            except ValueError: return lines[:k]
+            if e.get("done"): self.done.add(e["l"])
+            elif e.get("i") == len(self.rows.setdefault(e["l"], [])): self.rows[e["l"]].append(e["row"])
+        return lines
+
+    def _write(self, e, sync=False):
+        self.f.write(json.dumps(e) + "\n")
+        self.f.flush()
+        self._unsynced += 1
+        if sync or self._unsynced >= 25:
+            os.fsync(self.f.fileno()); self._unsynced = 0
+
+    def record(self, c, url, row):
+        rows = self.rows.setdefault(c, [])
+        self._write({"l": c, "i": len(rows), "url": url, "row": row})
+        rows.append(row)
+
+    def finish_letter(self, c):
+        self.done.add(c)
+        self._write({"l": c, "done": True}, sync=True)
+
+    def close(self):
+        self.f.close()
+
+    def discard(self):
+        self.close()
+        self.path.unlink(missing_ok=True)
+
+def build_roster(out_csv: Path, workers=None, incremental=None, progress=None):
+    # Profiles are fetched on a thread pool (rate-limited by BUCKET/_host_slot);
+    # rows are written in roster order, same as a sequential run.
+    # Rows stream into <out>.part and are journaled to <out>.journal; the .part
+    # only replaces out_csv once every roster page is done, so a crashed or
+    # partial run never leaves a truncated roster behind. Rerunning resumes.
+    # progress(**stats) is called after every fighter and roster page.
+    workers = workers or WORKERS
+    incremental = INCREMENTAL if incremental is None else incremental
+    letters = roster_letters()
     out_csv.parent.mkdir(parents=True, exist_ok=True)
-    with out_csv.open("w", newline="", encoding="utf-8") as f:
-        w = csv.DictWriter(f, fieldnames=COLS)
+    part = out_csv.with_name(out_csv.name + ".part")
+    ck = Checkpoint(out_csv.with_name(out_csv.name + ".journal"), letters)
+    cache = ProfileCache(SCRAPE_CACHE)
+    failed = []
+    err0 = COUNTERS["fetch_errors"] + COUNTERS["parse_errors"]
+    stats = {"letters_total": len(letters), "letters_done": 0, "letters_listed": 0, "fighters_done": 0,
+             "fighters_listed": 0, "written": 0, "errors": 0, "fighters_per_sec": 0.0}
+    t0, scraped = time.monotonic(), 0      # rate counts this run only, not replayed checkpoint rows
+
+    def report():
+        stats["errors"] = len(failed) + COUNTERS["fetch_errors"] + COUNTERS["parse_errors"] - err0
+        stats["fighters_per_sec"] = round(scraped / max(time.monotonic() - t0, 1e-9), 3)
+        if progress: progress(**stats)
+
+    with part.open("w", newline="", encoding="utf-8") as f, ThreadPoolExecutor(workers) as ex:
+        w = csv.DictWriter(f, fieldnames=COLS, extrasaction="ignore")
         w.writeheader()
-
-        for name, url in iter_roster_urls():
-            row = parse_profile(url)
-            if not row.get("Name"):
-                row["Name"] = name
-
-            # Active-only filter
-            is_active = True
+        history = []                            # (fighter, bout) for bouts.npz, in roster order
+
+        def keep(row):
+            w.writerow(row)
+            stats["written"] += 1
+            history.extend((row["Name"], b) for b in row.get("Bouts", []))
+
+        def emit(c, url, fut):
+            nonlocal scraped
+            row = fut.result()
+            scraped += 1
+            ck.record(c, url, row)
+            stats["fighters_done"] += 1
+            if row is not None:
+                keep(row)
+                print(f"[info] wrote: {row.get('Name','?')}", file=sys.stderr)
+            report()
+
+        for c in letters:
+            # replay what a previous run already finished for this letter
+            for row in ck.rows.get(c, []):
+                if row is not None: keep(row)
+            if c in ck.done:
+                stats["letters_done"] += 1
+                stats["letters_listed"] += 1
+                stats["fighters_listed"] += len(ck.rows.get(c, []))
+                stats["fighters_done"] += len(ck.rows.get(c, []))
+                continue
             try:
-                if row.get("LastFightDate"):
-                    last_dt = datetime.fromisoformat(row["LastFightDate"])
-                    years = (datetime.now(timezone.utc) - last_dt).days / 365.25
-                    if years > ACTIVE_YEARS:
-                        is_active = False
-                else:
-                    is_active = False
-
-                if int(row.get("BoutCount", 0)) < MIN_BOUTS:
-                    is_active = False
-            except Exception:
-                pass
-
-            if not is_active:
+                entries = letter_entries(c)
+                print(f"[info] roster page {c}: ok", file=sys.stderr)
+            except Exception as e:
+                print(f"[warn] roster page {c}: {e}", file=sys.stderr)
+                failed.append(c)
+                stats["letters_done"] += 1
+                report()
                 continue
-
-            # Merge defaults first, then real values override
-            row = {**default_stat_block(), **row}
-
-            w.writerow({k: row.get(k, "") for k in COLS})
-            print(f"[info] wrote: {row.get('Name','?')}", file=sys.stderr)
-            time.sleep(0.35)
-
+            stats["letters_listed"] += 1
+            stats["fighters_listed"] += len(entries)
+            stats["fighters_done"] += len(ck.rows.get(c, []))
+
+            pending = deque()
+            for name, url, listing in entries[len(ck.rows.get(c, [])):]:
+                pending.append((c, url, ex.submit(scrape_one, name, url, listing, cache, incremental)))
+                while len(pending) >= workers * 4:
+                    emit(*pending.popleft())
+            while pending:
+                emit(*pending.popleft())
+            ck.finish_letter(c)
+            stats["letters_done"] += 1
+            report()
+
+        f.flush()
+        os.fsync(f.fileno())
+
+    cache.close()
+    print(f"[info] scrape stats: {dict(COUNTERS)} | {stats['fighters_per_sec']} fighters/s", file=sys.stderr)
+    if failed:
+        ck.close()
+        raise RuntimeError(f"roster pages failed: {failed}; not publishing {out_csv}, "
+                           f"rerun to resume from {ck.path}")
+    os.replace(part, out_csv)
+    ck.discard()
     print(f"[ok] wrote {out_csv}", file=sys.stderr)
+    try:
+        # per-bout history for calibrate.py, next to the roster
+        import bouts
+        print(f"[ok] wrote {bouts.write(bouts.to_columns(history), out_csv.with_name('bouts.npz'))}"
+              f" ({len(history)} bouts)", file=sys.stderr)
+    except Exception as e:
+        print(f"[warn] bout history not written: {e}", file=sys.stderr)
+    try:
+        # compact mmap-able copy for the app (roster_bin.py); the CSV stays the export
+        from roster_bin import build_from_csv
+        print(f"[ok] wrote {build_from_csv(out_csv)}", file=sys.stderr)
+    except Exception as e:
+        print(f"[warn] binary roster not written: {e}", file=sys.stderr)
+
+# ---------- Parser benchmark ----------
+FIXTURES = Path(__file__).parent / "fixtures" / "profiles"     # profile pages incl. next/NC/draw rows
+
+def bench_parsers(paths, repeat=3):
+    # Parity (lxml vs bs4 must give identical rows) and pages/sec per backend
+    import io
+    from contextlib import redirect_stderr
+    pages = [(p.name, p.read_text(encoding="utf-8")) for p in paths]
+    out = {"pages": len(pages)}
+    with redirect_stderr(io.StringIO()):
+        out["mismatches"] = [n for n, h in pages if parse_profile_bs4(h, n) != parse_profile_lxml(h, n)]
+        for backend, fn in (("bs4", parse_profile_bs4), ("lxml", parse_profile_lxml)):
+            t = time.perf_counter()
+            for _ in range(repeat):
+                for n, h in pages:
+                    fn(h, n)
+            out[backend] = len(pages) * repeat / (time.perf_counter() - t)
+    return out
 
 # ---------- Main ----------
 if __name__ == "__main__":
+    if len(sys.argv) > 1 and sys.argv[1] == "--bench-parse":
+        # python full_roster_scraper.py --bench-parse [DIR]   (default: the committed
+        # fixtures; refresh or extend with pages saved by SAVE_HTML=DIR)
+        r = bench_parsers(sorted(Path(sys.argv[2] if len(sys.argv) > 2 else FIXTURES).glob("*.html")))
+        print(f"{r['pages']} pages | bs4 {r['bs4']:.1f} p/s | lxml {r['lxml']:.1f} p/s | "
+              f"speedup {r['lxml']/r['bs4']:.1f}x | mismatches {len(r['mismatches'])}")
+        for n in r["mismatches"]: print(f"[warn] parity mismatch: {n}")
+        sys.exit(1 if r["mismatches"] else 0)
     build_roster(Path("data/roster.csv"))
@@ -0,0 +1,166 @@
+# jobs.py — background runner for long admin tasks (roster scrapes)
+#
+# With a shared root (admin.py uses JOB_DIR) the runner also works across
+# `uvicorn --workers N`: each job's info() is mirrored to <root>/<id>.json so any
+# worker can answer for it, and a per-kind flock held for the job's lifetime
+# keeps a second worker from starting the same kind of job.
+import json, os, sys, threading, time, traceback, uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+from workers import _alive, fcntl
+
+JOB_DIR = Path(os.getenv("JOB_DIR", "data/.jobs"))
+SAVE_EVERY = 1.0        # seconds between progress writes to the shared file
+
+
+class Job:
+    def __init__(self, kind, root=None):
+        self.id = uuid.uuid4().hex[:12]
+        self.kind = kind
+        self.pid = os.getpid()
+        self.state = "queued"             # queued -> running -> done | failed
+        self.created = time.time()
+        self.started = self.finished = None
+        self.progress = {}
+        self.result = self.error = None
+        self.path = Path(root) / f"{self.id}.json" if root else None
+        self._saved = 0.0
+
+    def update(self, **kw):
+        # called from the worker thread; a dict swap keeps readers consistent
+        self.progress = {**self.progress, **kw}
+        if self.path and time.time() - self._saved >= SAVE_EVERY:
+            self.save()
+
+    def save(self):
+        if not self.path: return
+        self._saved = time.time()
+        try:
+            tmp = self.path.with_name(f"{self.path.name}.{os.getpid()}.tmp")
+            tmp.write_text(json.dumps(self.info(), default=str))
+            os.replace(tmp, self.path)
+        except OSError as e:
+            print(f"[warn] job {self.id}: could not save state: {e}", file=sys.stderr)
+
+    def eta(self):
+        # fighters left (unknown pages estimated from the per-page average) / observed rate
+        p = self.progress
+        done, listed = p.get("fighters_done", 0), p.get("fighters_listed", 0)
+        pages_listed, pages = p.get("letters_listed", 0), p.get("letters_total", 0)
+        if self.state != "running" or not done or not pages_listed:
+            return None
+        total = listed + listed / pages_listed * max(pages - pages_listed, 0)
+        rate = done / max(time.time() - self.started, 1e-6)
+        return max(total - done, 0) / rate
+
+    def info(self):
+        now = self.finished or time.time()
+        return {"id": self.id, "kind": self.kind, "pid": self.pid, "state": self.state,
+                "created": self.created, "started": self.started, "finished": self.finished,
+                "elapsed": (now - self.started) if self.started else None,
+                "eta_secs": self.eta(), "progress": self.progress,
+                "result": self.result, "error": self.error}
+
+
+class JobRunner:
+    # One worker thread by default: scrapes run one at a time, and the serving
+    # path keeps using the current roster snapshot until a new one is published.
+    def __init__(self, workers=1, keep=50, root=None):
+        self._ex = ThreadPoolExecutor(workers, thread_name_prefix="job")
+        self._jobs = OrderedDict()
+        self._lock = threading.Lock()
+        self.keep = keep
+        self.root = Path(root) if root else None
+
+    def _claim(self, kind):
+        # -> open lock file (held until the job ends), None without a shared
+        # root, or False when another process already runs this kind
+        if self.root is None:
+            return None
+        self.root.mkdir(parents=True, exist_ok=True)
+        if fcntl is None:
+            return None
+        f = open(self.root / f"{kind}.lock", "a")
+        try:
+            fcntl.flock(f, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            f.close()
+            return False
+        return f
+
+    def submit(self, kind, fn, *args, **kw):
+        # fn(job, *args, **kw) -> JSON-able result. Returns (job info, created); an
+        # unfinished job of the same kind, in any worker, is returned instead of
+        # starting another.
+        with self._lock:
+            for j in self._jobs.values():
+                if j.kind == kind and j.state in ("queued", "running"):
+                    return j.info(), False
+            held = self._claim(kind)
+            if held is False:
+                # the owner writes its file right after taking the lock
+                for _ in range(20):
+                    other = next((j for j in self._shared() if j["kind"] == kind
+                                  and j["state"] in ("queued", "running")), None)
+                    if other: return other, False
+                    time.sleep(0.05)
+                return {"id": None, "kind": kind, "state": "running"}, False
+            job = Job(kind, self.root)
+            job.save()
+            self._jobs[job.id] = job
+            while len(self._jobs) > self.keep:
+                self._jobs.popitem(last=False)
+            self._prune()
+        self._ex.submit(self._run, job, held, fn, args, kw)
+        return job.info(), True
+
+    def _run(self, job, held, fn, args, kw):
+        job.state, job.started = "running", time.time()
+        job.save()
+        try:
+            job.result = fn(job, *args, **kw)
+            job.state = "done"
+        except Exception as e:
+            job.error = f"{type(e).__name__}: {e}"
+            job.state = "failed"
+            print(f"[warn] job {job.id} failed: {job.error}\n{traceback.format_exc()}", file=sys.stderr)
+        finally:
+            job.finished = time.time()
+            job.save()
+            if held: held.close()         # releases the flock
+
+    def _shared(self):
+        # jobs recorded by every process under root; unfinished jobs whose
+        # process is gone are reported as failed
+        out = []
+        if self.root is None or not self.root.exists():
+            return out
+        for p in self.root.glob("*.json"):
+            try:
+                j = json.loads(p.read_text())
+            except (OSError, ValueError):
+                continue
+            if j["state"] in ("queued", "running") and not _alive(j.get("pid", -1)):
+                j = {**j, "state": "failed", "error": "worker exited before the job finished"}
+            out.append(j)
+        return out
+
+    def _prune(self):
+        if self.root is None: return
+        files = sorted(self.root.glob("*.json"), key=lambda p: p.stat().st_mtime, reverse=True)
+        for p in files[self.keep:]:
+            p.unlink(missing_ok=True)
+
+    def get(self, job_id):
+        j = self._jobs.get(job_id)
+        if j is not None:
+            return j.info()
+        return next((j for j in self._shared() if j["id"] == job_id), None)
+
+    def list(self):
+        with self._lock:
+            local = {j.id: j.info() for j in self._jobs.values()}
+        merged = {**{j["id"]: j for j in self._shared()}, **local}
+        return sorted(merged.values(), key=lambda j: j["created"], reverse=True)[:self.keep]
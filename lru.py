@@ -0,0 +1,39 @@
+# lru.py — small thread-safe LRU cache with optional TTL and hit/miss counters
+import threading, time
+from collections import OrderedDict
+
+
+class LRU:
+    def __init__(self, maxsize=4096, ttl=None):
+        self.maxsize, self.ttl = maxsize, ttl
+        self._d = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = self.misses = 0
+
+    def get(self, key):
+        with self._lock:
+            hit = self._d.get(key)
+            if hit is not None and (self.ttl is None or time.monotonic() - hit[0] < self.ttl):
+                self._d.move_to_end(key)
+                self.hits += 1
+                return hit[1]
+            if hit is not None:
+                del self._d[key]
+            self.misses += 1
+            return None
+
+    def put(self, key, value):
+        with self._lock:
+            self._d[key] = (time.monotonic(), value)
+            self._d.move_to_end(key)
+            while len(self._d) > self.maxsize:
+                self._d.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._d.clear()
+
+    def stats(self):
+        n = self.hits + self.misses
+        return {"size": len(self._d), "maxsize": self.maxsize, "ttl": self.ttl,
+                "hits": self.hits, "misses": self.misses, "hit_rate": (self.hits / n) if n else None}
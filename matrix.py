@@ -0,0 +1,96 @@
+# matrix.py — all-pairs head-to-head matrices, blocked and cached per roster version
+import hashlib, json, os, shutil, sys, threading, zipfile
+from pathlib import Path
+
+import numpy as np
+
+from model import pair_block
+from workers import flock
+
+CACHE = Path(os.getenv("MATRIX_CACHE", "/tmp/mma-matrix"))
+BLOCK = int(os.getenv("MATRIX_BLOCK", "256"))          # rows per block: BLOCK x N x 3 floats live at once
+MATRIX_MAX = int(os.getenv("MATRIX_MAX", "5000"))
+FIELDS = ["P_A", "P_A_KO", "P_A_SUB", "P_A_DEC"]
+
+# threads of one process wait on _lock(key); worker processes on the cache's flock
+_locks = {}
+_guard = threading.Lock()
+
+def _key(roster, idx):
+    sub = hashlib.sha1(",".join(map(str, idx)).encode()).hexdigest()[:10]
+    return f"{roster.sha[:12]}-{sub}"
+
+def _lock(key):
+    with _guard:
+        return _locks.setdefault(key, threading.Lock())
+
+def _prune(keep_prefix):
+    # drop matrices from older roster versions, and temp dirs of builds that died
+    # (called under the cache flock, so no live build owns one)
+    if not CACHE.exists(): return
+    for d in CACHE.iterdir():
+        if d.is_dir() and (d.name.endswith(".tmp") or not d.name.startswith((keep_prefix, "."))):
+            shutil.rmtree(d, ignore_errors=True)
+
+def build(roster, idx, block=BLOCK):
+    # Compute the matrix into float32 .npy memmaps, one block of rows at a time.
+    # The finished directory is renamed into place, so its existence means complete;
+    # a worker that waited on the lock finds it there and reuses it.
+    idx = np.asarray(idx, dtype=np.int64)
+    if len(idx) > MATRIX_MAX:
+        raise ValueError(f"matrix limited to {MATRIX_MAX} fighters, got {len(idx)}")
+    key = _key(roster, idx)
+    d = CACHE / key
+    if d.exists(): return d
+    CACHE.mkdir(parents=True, exist_ok=True)
+    with _lock(key), flock(CACHE / ".lock"):
+        if d.exists(): return d
+        _prune(roster.sha[:12])
+        tmp = CACHE / f".{key}.{os.getpid()}.tmp"
+        shutil.rmtree(tmp, ignore_errors=True); tmp.mkdir()
+        n = len(idx)
+        mm = {f: np.lib.format.open_memmap(tmp / f"{f}.npy", "w+", np.float32, (n, n)) for f in FIELDS}
+        for i0 in range(0, n, block):
+            blk = pair_block(roster.scores, idx, i0, min(i0 + block, n))
+            for f in FIELDS:
+                mm[f][i0:i0 + block] = blk[f]
+        for m in mm.values(): m.flush()
+        del mm
+        np.save(tmp / "R.npy", roster.scores.R[idx].astype(np.float32))
+        names = [roster.name_list[i] for i in idx]
+        (tmp / "meta.json").write_text(json.dumps({"version": roster.version, "sha": roster.sha,
+                                                   "fields": FIELDS, "names": names}))
+        os.replace(tmp, d)
+        print(f"[info] matrix {key}: {n}x{n} cached", file=sys.stderr)
+    return d
+
+def npz(d):
+    # Compressed NPZ built from the cached .npy files without loading them whole.
+    out = d / "matrix.npz"
+    if out.exists(): return out
+    with _lock(d.name + ".npz"), flock(CACHE / ".lock"):
+        if out.exists(): return out
+        tmp = d / f".matrix.npz.{os.getpid()}.tmp"
+        with zipfile.ZipFile(tmp, "w", zipfile.ZIP_DEFLATED, allowZip64=True) as zf:
+            for f in FIELDS + ["R"]:
+                with open(d / f"{f}.npy", "rb") as src, zf.open(f"{f}.npy", "w", force_zip64=True) as dst:
+                    shutil.copyfileobj(src, dst, 1 << 20)
+            zf.writestr("names.npy", _npy_bytes(np.array(json.loads((d / "meta.json").read_text())["names"])))
+        os.replace(tmp, out)
+    return out
+
+def _npy_bytes(a):
+    from io import BytesIO
+    buf = BytesIO(); np.save(buf, a); return buf.getvalue()
+
+def iter_ndjson(d, digits=5):
+    # One header line, then one line per fighter row: {"a": name, "P_A": [...], ...}
+    meta = json.loads((d / "meta.json").read_text())
+    mm = {f: np.load(d / f"{f}.npy", mmap_mode="r") for f in FIELDS}
+    yield json.dumps({"version": meta["version"], "names": meta["names"], "fields": FIELDS,
+                      "note": "P_B_* for (i,j) is P_A_* at (j,i)"}) + "\n"
+    for i, name in enumerate(meta["names"]):
+        row = {"a": name}
+        for f in FIELDS:
+            row[f] = np.round(mm[f][i].astype(np.float64), digits).tolist()
+        yield json.dumps(row) + "\n"
@@ -0,0 +1,112 @@
+# metrics.py — in-process Prometheus-style counters/histograms, stage timers
+# and an opt-in sampling profiler (no prometheus_client dependency)
+import sys, threading, time, traceback
+from collections import Counter
+from contextlib import contextmanager
+
+BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+class Histogram:
+    # cumulative-bucket histogram keyed by a label tuple
+    def __init__(self, name, help, labels, buckets=BUCKETS):
+        self.name, self.help, self.labels, self.buckets = name, help, labels, buckets
+        self._d = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value, *labels):
+        with self._lock:
+            h = self._d.get(labels)
+            if h is None:
+                h = self._d[labels] = [[0] * len(self.buckets), 0.0, 0]
+            for k, b in enumerate(self.buckets):
+                if value <= b: h[0][k] += 1
+            h[1] += value; h[2] += 1
+
+    def snapshot(self):
+        # JSON-able copy of every series, so other worker processes can merge it
+        with self._lock:
+            return [[list(k), [*v[0]], v[1], v[2]] for k, v in self._d.items()]
+
+    def render(self, others=()):
+        # others: snapshot()s from other processes, summed series by series
+        out = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            merged = {k: ([*v[0]], v[1], v[2]) for k, v in self._d.items()}
+        for snap in others:
+            for labels, counts, total, n in snap:
+                k = tuple(labels)
+                c, t, m = merged.get(k, ([0] * len(self.buckets), 0.0, 0))
+                merged[k] = ([a + b for a, b in zip(c, counts)], t + total, m + n)
+        items = sorted(merged.items(), key=lambda kv: [str(x) for x in kv[0]])
+        for labels, (counts, total, n) in items:
+            lab = ",".join(f'{k}="{_esc(v)}"' for k, v in zip(self.labels, labels))
+            sep = "," if lab else ""
+            for b, c in zip(self.buckets, counts):
+                out.append(f'{self.name}_bucket{{{lab}{sep}le="{b}"}} {c}')
+            out.append(f'{self.name}_bucket{{{lab}{sep}le="+Inf"}} {n}')
+            out.append(f"{self.name}_sum{{{lab}}} {total:.6f}")
+            out.append(f"{self.name}_count{{{lab}}} {n}")
+        return out
+
+def _esc(v):
+    return str(v).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+REQUESTS = Histogram("http_request_duration_seconds", "Request latency by route.", ("method", "route", "status"))
+STAGES = Histogram("stage_duration_seconds", "Time spent per pipeline stage.", ("stage",))
+
+@contextmanager
+def timer(stage):
+    t = time.perf_counter()
+    try:
+        yield
+    finally:
+        STAGES.observe(time.perf_counter() - t, stage)
+
+def render_counters(name, help, counters, kind="counter"):
+    # a {key: value} mapping as one metric family labelled by key
+    out = [f"# HELP {name} {help}", f"# TYPE {name} {kind}"]
+    out += [f'{name}{{key="{_esc(k)}"}} {v}' for k, v in sorted(dict(counters).items()) if v is not None]
+    return out
+
+# ---------- Sampling profiler ----------
+def _passes(frame, roots):
+    while frame is not None:
+        if frame.f_code in roots: return True
+        frame = frame.f_back
+    return False
+
+class Sampler:
+    # Samples the Python stacks of the given threads (default: all but itself)
+    # every `interval` seconds; collapsed() gives "frame;frame;frame count" lines
+    # for flamegraph.pl / speedscope. With roots (code objects), only stacks
+    # passing through one of them are kept: a request's endpoint runs on the loop
+    # thread or on whichever threadpool thread picks it up, and this keeps it while
+    # dropping the heartbeat, job threads and other routes.
+    def __init__(self, interval=0.001, threads=None, roots=None):
+        self.interval, self.threads, self.roots = interval, threads, roots
+        self.stacks = Counter()
+        self.samples = 0
+        self._stop = threading.Event()
+        self._t = threading.Thread(target=self._run, daemon=True)
+
+    def _run(self):
+        me = threading.get_ident()
+        while not self._stop.wait(self.interval):
+            for tid, frame in sys._current_frames().items():
+                if tid == me or (self.threads is not None and tid not in self.threads): continue
+                if self.roots is not None and not _passes(frame, self.roots): continue
+                stack = ";".join(f"{f.name} ({f.filename.rsplit('/', 1)[-1]}:{f.lineno})"
+                                 for f in traceback.extract_stack(frame))
+                self.stacks[stack] += 1
+            self.samples += 1
+
+    def __enter__(self):
+        self._t.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._t.join()
+
+    def collapsed(self):
+        return "\n".join(f"{s} {n}" for s, n in self.stacks.most_common()) + "\n"
@@ -0,0 +1,216 @@
+# model.py — rating/method model: scalar reference + vectorized engine
+import hashlib
+
+import numpy as np
+# pandas is imported where a DataFrame is handled: serving from roster.bin never needs it
+
+DIV_BENCH = [
+    ("SSLpm",3.00,1.20),("SSApm",3.00,1.20),("Acc",0.47,0.08),("Def",0.53,0.08),("KDpm",0.15,0.20),
+    ("TD15",1.50,1.50),("TDAcc",0.38,0.15),("TDD",0.65,0.20),("TopCtl",0.15,0.15),("BottomCtl",0.15,0.15),
+    ("Sub15",0.40,0.60),("OppEsc",0.50,0.25),("Attpm",8.00,2.50),("LateRet",0.75,0.20),
+    ("KDtakenpm",0.12,0.18),("KDlast12m",0.20,0.40),("Whiff",0.40,0.15),("WPA",0.00,1.00),("Fouls",0.10,0.20),
+    ("Camp",0.00,1.00),("HeadRate",0.70,0.15),("CARDIO_ret",0.75,0.20),("FinishRate",0.50,0.25),
+]
+ZMAP = {m:(mu,sd) for m,mu,sd in DIV_BENCH}
+
+def z(x, mu, sd):
+    try: return max(-3.0, min(3.0, (float(x)-mu)/sd)) if sd else 0.0
+    except: return 0.0
+
+def rating(a, b):
+    ZA = lambda m: z(a.get(m,0), *ZMAP.get(m,(0,1)))
+    ZB = lambda m: z(b.get(m,0), *ZMAP.get(m,(0,1)))
+    STR_A = 0.50*(ZA("SSLpm")-ZA("SSApm")) + 0.20*ZA("Acc") + 0.20*ZA("Def") + 0.10*ZA("KDpm")
+    STR_B = 0.50*(ZB("SSLpm")-ZB("SSApm")) + 0.20*ZB("Acc") + 0.20*ZB("Def") + 0.10*ZB("KDpm")
+    GRP_A = 0.35*ZA("TD15") + 0.20*ZA("TDAcc") + 0.25*ZA("TopCtl") + 0.20*ZA("Sub15") - 0.15*ZA("OppEsc")
+    GRP_B = 0.35*ZB("TD15") + 0.20*ZB("TDAcc") + 0.25*ZB("TopCtl") + 0.20*ZB("Sub15") - 0.15*ZB("OppEsc")
+    GRP_DA= 0.55*ZA("TDD") + 0.20*ZA("BottomCtl")
+    GRP_DB= 0.55*ZB("TDD") + 0.20*ZB("BottomCtl")
+    PACE_A= 0.60*ZA("Attpm") + 0.40*ZA("LateRet")
+    PACE_B= 0.60*ZB("Attpm") + 0.40*ZB("LateRet")
+    DUR_A = 0.55*(-ZA("KDtakenpm")) + 0.25*(-ZA("KDlast12m")) + 0.20*(-ZA("SSApm"))
+    DUR_B = 0.55*(-ZB("KDtakenpm")) + 0.25*(-ZB("KDlast12m")) + 0.20*(-ZB("SSApm"))
+    IQ_A  = 0.40*ZA("Acc") - 0.20*ZA("Whiff") + 0.40*ZA("WPA") - 0.20*ZA("Fouls")
+    IQ_B  = 0.40*ZB("Acc") - 0.20*ZB("Whiff") + 0.40*ZB("WPA") - 0.20*ZB("Fouls")
+    CTX_A = 0.25*ZA("Camp"); CTX_B = 0.25*ZB("Camp")
+    R_A = 0.28*STR_A + 0.24*(GRP_A - 0.6*GRP_DA) + 0.14*PACE_A + 0.16*DUR_A + 0.12*IQ_A + 0.06*CTX_A
+    R_B = 0.28*STR_B + 0.24*(GRP_B - 0.6*GRP_DB) + 0.14*PACE_B + 0.16*DUR_B + 0.12*IQ_B + 0.06*CTX_B
+    return R_A, R_B
+
+def softmax3(e1,e2,e3):
+    mx=max(e1,e2,e3); a=np.exp(e1-mx); b=np.exp(e2-mx); c=np.exp(e3-mx); s=a+b+c; return a/s,b/s,c/s
+
+def methods(a,b):
+    ZA = lambda m: z(a.get(m,0), *ZMAP.get(m,(0,1)))
+    ZB = lambda m: z(b.get(m,0), *ZMAP.get(m,(0,1)))
+    eta_A_KO  = -0.30 + 0.55*ZA("KDpm") - 0.45*(0.55*(-ZB("KDtakenpm")) + 0.25*(-ZB("KDlast12m")) + 0.20*(-ZB("SSApm"))) + 0.20*ZA("HeadRate")
+    eta_A_SUB = -0.50 + 0.60*ZA("Sub15") + 0.45*ZA("TDAcc") - 0.55*ZB("TDD") + 0.25*ZA("TopCtl")
+    eta_A_DEC = -0.10 + 0.40*(0.60*ZA("Attpm") + 0.40*ZA("LateRet")) + 0.30*ZA("CARDIO_ret") - 0.25*(ZA("FinishRate")+ZB("FinishRate"))
+    qA_KO,qA_SUB,qA_DEC = softmax3(eta_A_KO,eta_A_SUB,eta_A_DEC)
+
+    eta_B_KO  = -0.30 + 0.55*ZB("KDpm") - 0.45*(0.55*(-ZA("KDtakenpm")) + 0.25*(-ZA("KDlast12m")) + 0.20*(-ZA("SSApm"))) + 0.20*ZB("HeadRate")
+    eta_B_SUB = -0.50 + 0.60*ZB("Sub15") + 0.45*ZB("TDAcc") - 0.55*ZA("TDD") + 0.25*ZB("TopCtl")
+    eta_B_DEC = -0.10 + 0.40*(0.60*ZB("Attpm") + 0.40*ZB("LateRet")) + 0.30*ZB("CARDIO_ret") - 0.25*(ZA("FinishRate")+ZB("FinishRate"))
+    qB_KO,qB_SUB,qB_DEC = softmax3(eta_B_KO,eta_B_SUB,eta_B_DEC)
+    return dict(qA_KO=qA_KO,qA_SUB=qA_SUB,qA_DEC=qA_DEC,qB_KO=qB_KO,qB_SUB=qB_SUB,qB_DEC=qB_DEC)
+
+# ---------- Vectorized engine ----------
+# Every composite and linear predictor above is linear in the clipped z-scores,
+# so each one is a weight vector over METRICS. Scores are built once per roster
+# load; a matchup is then a few row lookups and a 3-way softmax.
+METRICS = [m for m,_,_ in DIV_BENCH]
+_MU = np.array([mu for _,mu,_ in DIV_BENCH])
+_SD = np.array([sd for _,_,sd in DIV_BENCH])
+
+def _w(**kw):
+    v = np.zeros(len(METRICS))
+    for m, c in kw.items():
+        v[METRICS.index(m)] += c
+    return v
+
+STR   = _w(SSLpm=0.50, SSApm=-0.50, Acc=0.20, Def=0.20, KDpm=0.10)
+GRP   = _w(TD15=0.35, TDAcc=0.20, TopCtl=0.25, Sub15=0.20, OppEsc=-0.15)
+GRP_D = _w(TDD=0.55, BottomCtl=0.20)
+PACE  = _w(Attpm=0.60, LateRet=0.40)
+DUR   = _w(KDtakenpm=-0.55, KDlast12m=-0.25, SSApm=-0.20)
+IQ    = _w(Acc=0.40, Whiff=-0.20, WPA=0.40, Fouls=-0.20)
+CTX   = _w(Camp=0.25)
+COMPOSITES = ["STR","GRP","GRP_D","PACE","DUR","IQ","CTX"]
+W_COMP = np.stack([STR,GRP,GRP_D,PACE,DUR,IQ,CTX], axis=1)           # metrics x composites
+W_R    = W_COMP @ np.array([0.28, 0.24, -0.24*0.6, 0.14, 0.16, 0.12, 0.06])
+
+# eta_X = C_ETA + Z[own] @ W_OWN + Z[opp] @ W_OPP, columns KO/SUB/DEC
+C_ETA = np.array([-0.30, -0.50, -0.10])
+W_OWN = np.stack([_w(KDpm=0.55, HeadRate=0.20),
+                  _w(Sub15=0.60, TDAcc=0.45, TopCtl=0.25),
+                  0.40*PACE + _w(CARDIO_ret=0.30, FinishRate=-0.25)], axis=1)
+W_OPP = np.stack([-0.45*DUR,
+                  _w(TDD=-0.55),
+                  _w(FinishRate=-0.25)], axis=1)
+
+def zmatrix(df):
+    # Same coercion as pick()+z(): missing column or NaN -> value 0,
+    # non-numeric text -> z of 0.
+    import pandas as pd
+    Z = np.zeros((len(df), len(METRICS)))
+    for j, m in enumerate(METRICS):
+        if m not in df:
+            x = np.zeros(len(df))
+            bad = np.zeros(len(df), bool)
+        else:
+            col = df[m]
+            x = pd.to_numeric(col, errors="coerce").to_numpy(float)
+            bad = np.isnan(x) & col.notna().to_numpy()
+            x = np.where(np.isnan(x), 0.0, x)
+        Z[:, j] = np.where(bad, 0.0, np.clip((x - _MU[j]) / _SD[j], -3.0, 3.0))
+    return Z
+
+def zmatrix_table(table):
+    # roster_bin.Table: float32 metric block, NaN = empty/non-numeric -> value 0
+    Z = np.zeros((len(table), len(METRICS)))
+    for j, m in enumerate(METRICS):
+        col = table.column(m)
+        x = np.zeros(len(table)) if col is None else np.nan_to_num(col.astype(np.float64), nan=0.0)
+        Z[:, j] = np.clip((x - _MU[j]) / _SD[j], -3.0, 3.0)
+    return Z
+
+# changes whenever the benchmarks or weights do; precomputed Scores carry it
+FINGERPRINT = hashlib.sha1(b"".join(np.ascontiguousarray(a, dtype="<f8").tobytes()
+                                    for a in (_MU, _SD, W_COMP, W_R, C_ETA, W_OWN, W_OPP))).hexdigest()[:16]
+
+class Scores:
+    FIELDS = ("Z", "C", "R", "OWN", "OPP")
+
+    def __init__(self, Z):
+        self.Z = Z
+        self.C = self.Z @ W_COMP
+        self.R = self.Z @ W_R
+        self.OWN = C_ETA + self.Z @ W_OWN
+        self.OPP = self.Z @ W_OPP
+
+    @classmethod
+    def from_arrays(cls, arrays):
+        # already-scored arrays, e.g. read-only views into a mapped roster.bin
+        S = cls.__new__(cls)
+        for f in cls.FIELDS:
+            setattr(S, f, arrays[f])
+        return S
+
+def win_prob(R_A, R_B):
+    return 1/(1+np.exp(-1.35*(0.80*(R_A-R_B))))
+
+def _softmax(eta):
+    e = np.exp(eta - eta.max(axis=-1, keepdims=True))
+    return e / e.sum(axis=-1, keepdims=True)
+
+def predict_idx(S, ia, ib):
+    # ia/ib: row indices (scalars or equal-length arrays) into the roster
+    R_A, R_B = S.R[ia], S.R[ib]
+    P_A = win_prob(R_A, R_B)
+    qA = _softmax(S.OWN[ia] + S.OPP[ib])
+    qB = _softmax(S.OWN[ib] + S.OPP[ia])
+    return dict(
+        P_A=P_A,
+        P_A_KO=P_A*qA[...,0], P_A_SUB=P_A*qA[...,1], P_A_DEC=P_A*qA[...,2],
+        P_B_KO=(1-P_A)*qB[...,0], P_B_SUB=(1-P_A)*qB[...,1], P_B_DEC=(1-P_A)*qB[...,2],
+        R_A=R_A, R_B=R_B,
+    )
+
+def pair_block(S, idx, i0, i1):
+    # rows idx[i0:i1] against every fighter in idx. Only the A-side fields are
+    # returned: P_B_KO[i,j] == P_A_KO[j,i] etc., so B is the transpose.
+    ra, rb = idx[i0:i1], idx
+    P_A = win_prob(S.R[ra][:,None], S.R[rb][None,:])
+    qA = _softmax(S.OWN[ra][:,None,:] + S.OPP[rb][None,:,:])
+    return dict(P_A=P_A, P_A_KO=P_A*qA[...,0], P_A_SUB=P_A*qA[...,1], P_A_DEC=P_A*qA[...,2])
+
+def predict_scalar(A, B):
+    # reference path: the original per-request computation on two row dicts
+    R_A, R_B = rating(A,B)
+    P_A = win_prob(R_A, R_B)
+    m = methods(A,B)
+    return dict(
+        P_A=P_A,
+        P_A_KO=P_A*m["qA_KO"], P_A_SUB=P_A*m["qA_SUB"], P_A_DEC=P_A*m["qA_DEC"],
+        P_B_KO=(1-P_A)*m["qB_KO"], P_B_SUB=(1-P_A)*m["qB_SUB"], P_B_DEC=(1-P_A)*m["qB_DEC"],
+        R_A=R_A, R_B=R_B,
+    )
+
+# ---------- Parity check: python model.py [roster.csv] ----------
+def check_parity(df, pairs=2000, tol=1e-9, tol32=1e-5, seed=0):
+    # predict_scalar vs both engines: the float64 zmatrix(df) path (to tol) and the
+    # served path, roster_bin.from_frame -> float32 metric block -> zmatrix_table
+    # (to tol32: metrics are stored as float32, ~6e-8 relative)
+    import pandas as pd
+    from roster_bin import from_frame
+    rows = [{k:(v if pd.notna(v) else 0) for k,v in r.items()} for r in df.to_dict("records")]
+    engines = {"float64": (Scores(zmatrix(df)), tol), "served": (Scores(zmatrix_table(from_frame(df))), tol32)}
+    rng = np.random.default_rng(seed)
+    ia = rng.integers(0, len(rows), pairs); ib = rng.integers(0, len(rows), pairs)
+    vec = {name: predict_idx(S, ia, ib) for name, (S, _) in engines.items()}
+    worst = dict.fromkeys(engines, 0.0)
+    for k,(i,j) in enumerate(zip(ia, ib)):
+        ref = predict_scalar(rows[i], rows[j])
+        for name, v in vec.items():
+            worst[name] = max(worst[name], max(abs(float(ref[f]) - float(v[f][k])) for f in ref))
+    for name, (_, t) in engines.items():
+        assert worst[name] <= t, f"parity failed ({name}): max abs diff {worst[name]:.3g} > {t:g}"
+    return worst
+
+def synthetic_roster(n, seed=0):
+    import pandas as pd
+    rng = np.random.default_rng(seed)
+    df = pd.DataFrame({m: rng.normal(mu, sd*1.5, n) for m,mu,sd in DIV_BENCH})
+    df.insert(0, "Name", [f"Fighter {i}" for i in range(n)])
+    df.loc[rng.random(n) < 0.05, "Attpm"] = np.nan          # exercise NaN -> 0
+    return df
+
+if __name__ == "__main__":
+    import sys
+    import pandas as pd
+    df = pd.read_csv(sys.argv[1]) if len(sys.argv) > 1 else synthetic_roster(500)
+    if len(df) == 0:
+        df = synthetic_roster(500)
+    worst = check_parity(df)
+    print(f"[ok] parity max abs diff float64 {worst['float64']:.3g}, served (float32) {worst['served']:.3g} "
+          f"over {len(df)} fighters")
@@ -0,0 +1,77 @@
+# name_index.py — normalized fighter-name lookup and fuzzy/prefix search
+import re, unicodedata
+from bisect import bisect_left
+
+import numpy as np
+
+_APOS = re.compile(r"['‘’ʼ`]")
+_NONALNUM = re.compile(r"[^0-9a-z]+")
+
+def normalize(name):
+    # "José Aldo" / "jose  aldo" / "JOSE-ALDO" -> "jose aldo"; "O'Malley" -> "omalley"
+    s = unicodedata.normalize("NFKD", str(name))
+    s = "".join(ch for ch in s if not unicodedata.combining(ch)).lower()
+    s = _APOS.sub("", s)
+    return _NONALNUM.sub(" ", s).strip()
+
+def _grams(s):
+    s = f"  {s} "
+    return {s[i:i+3] for i in range(len(s) - 2)}
+
+class NameIndex:
+    def __init__(self, names):
+        # names: per-row display names (row order); first row wins on duplicates
+        self.exact = {}
+        self.display = []              # unique display names, search results index into this
+        self.rows = []                 # row index for each display entry
+        self.norm = []
+        for i, n in enumerate(names):
+            if not n: continue
+            k = normalize(n)
+            if not k or k in self.exact: continue
+            self.exact[k] = i
+            self.display.append(n); self.rows.append(i); self.norm.append(k)
+        # prefix lookups: sorted (key, entry) for the full name and every token
+        keys = []
+        for e, k in enumerate(self.norm):
+            keys.append((k, e))
+            toks = k.split()
+            for t in range(1, len(toks)):
+                keys.append((" ".join(toks[t:]), e))
+        keys.sort()
+        self._pkeys = [k for k, _ in keys]
+        self._pent = [e for _, e in keys]
+        # trigram postings for typo-tolerant matches
+        grams = {}
+        self._glen = np.zeros(len(self.norm))
+        for e, k in enumerate(self.norm):
+            g = _grams(k)
+            self._glen[e] = len(g)
+            for t in g:
+                grams.setdefault(t, []).append(e)
+        self.grams = {t: np.array(v, dtype=np.int32) for t, v in grams.items()}
+
+    def lookup(self, name):
+        return self.exact.get(normalize(name))
+
+    def _prefix(self, q, limit=200):
+        out = []
+        j = bisect_left(self._pkeys, q)
+        while j < len(self._pkeys) and self._pkeys[j].startswith(q) and len(out) < limit:
+            out.append(self._pent[j]); j += 1
+        return out
+
+    def search(self, q, k=10):
+        # Prefix hits (full name or any later token) rank first, then trigram
+        # Dice similarity; returns [(display name, score)], best first.
+        q = normalize(q)
+        if not q or not self.norm: return []
+        qg = _grams(q)
+        post = [self.grams[t] for t in qg if t in self.grams]
+        common = np.bincount(np.concatenate(post), minlength=len(self.norm)) if post else np.zeros(len(self.norm))
+        score = 2.0 * common / (len(qg) + self._glen)
+        for e in set(self._prefix(q)):
+            score[e] += 1.0 if self.norm[e].startswith(q) else 0.8
+        top = np.argpartition(-score, min(k, len(score) - 1))[:k] if len(score) > k else np.arange(len(score))
+        best = sorted(((int(e), float(score[e])) for e in top), key=lambda x: (-x[1], self.norm[x[0]]))
+        return [(self.display[e], round(s, 4)) for e, s in best if s >= 0.2]
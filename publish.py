@@ -0,0 +1,202 @@
+# publish.py — delta roster publishing: sharded CSVs + manifest + change records
+#
+# Published layout under PREFIX (default data/roster/):
+#   manifest.json         columns, per-shard sha1/rows, roster sha, fighter count
+#   <key>.csv             fighters whose last name starts with key (a-z, "_" = other),
+#                         same columns and relative order as the source roster.csv
+#   changes/<ts>-<sha>.json   what one publish changed: added / removed fighters
+#                         and {fighter: {field: [old, new]}}
+# A publish reads the target's manifest, hashes the new shards, fetches only the
+# shards whose hash moved (for the field-level delta) and writes just those plus
+# the manifest and one change record, as one commit. Nothing changed -> no write.
+#
+#   python publish.py data/roster.csv [--target dir:PATH | github] [--dry-run]
+#   python publish.py assemble [--out data/roster.csv]      # shards -> roster.csv (Render build)
+import base64, csv, hashlib, io, json, os, sys, time
+from pathlib import Path
+
+from name_index import normalize
+
+PREFIX = os.getenv("PUBLISH_PREFIX", "data/roster")
+
+# ---------- Targets ----------
+# read(path) -> bytes or None; commit({path: bytes, or None to delete}, message)
+class DirTarget:
+    # local stand-in for the repo: tests, dry runs, and the Actions workflow
+    # publishing into its own checkout
+    def __init__(self, root):
+        self.root = Path(root)
+
+    def read(self, path):
+        p = self.root / path
+        return p.read_bytes() if p.exists() else None
+
+    def commit(self, files, message):
+        for path, data in files.items():
+            p = self.root / path
+            if data is None:
+                p.unlink(missing_ok=True); continue
+            p.parent.mkdir(parents=True, exist_ok=True)
+            tmp = p.with_name(p.name + ".tmp")
+            tmp.write_bytes(data)
+            os.replace(tmp, p)
+        return {"target": f"dir:{self.root}", "files": len(files)}
+
+class GitHubTarget:
+    # One commit per publish through the git data API (blobs -> tree -> commit
+    # -> ref), so only the changed shards travel and the contents-API size
+    # limits never apply.
+    def __init__(self, repo, branch, token):
+        self.repo, self.branch, self.token = repo, branch, token
+
+    def _call(self, method, path, body=None, raw=False):
+        import requests
+        r = requests.request(method, f"https://api.github.com/repos/{self.repo}/{path}", timeout=30,
+                             headers={"Authorization": f"token {self.token}",
+                                      "Accept": "application/vnd.github.raw" if raw else "application/vnd.github+json"},
+                             params={"ref": self.branch} if raw else None,
+                             data=json.dumps(body) if body is not None else None)
+        if raw and r.status_code == 404:
+            return None
+        r.raise_for_status()
+        return r.content if raw else r.json()
+
+    def read(self, path):
+        return self._call("GET", f"contents/{path}", raw=True)
+
+    def commit(self, files, message):
+        head = self._call("GET", f"git/ref/heads/{self.branch}")["object"]["sha"]
+        base = self._call("GET", f"git/commits/{head}")["tree"]["sha"]
+        tree = []
+        for path, data in files.items():
+            sha = None if data is None else self._call(
+                "POST", "git/blobs", {"content": base64.b64encode(data).decode("ascii"), "encoding": "base64"})["sha"]
+            tree.append({"path": path, "mode": "100644", "type": "blob", "sha": sha})
+        t = self._call("POST", "git/trees", {"base_tree": base, "tree": tree})["sha"]
+        c = self._call("POST", "git/commits", {"message": message, "tree": t, "parents": [head]})["sha"]
+        # not forced: fails instead of overwriting if the branch moved meanwhile
+        self._call("PATCH", f"git/refs/heads/{self.branch}", {"sha": c})
+        return {"target": f"github:{self.repo}@{self.branch}", "commit": c, "files": len(files)}
+
+def target_from_env(spec=None):
+    spec = spec or os.getenv("PUBLISH_TARGET", "github")
+    if spec.startswith("dir:"):
+        return DirTarget(spec[4:])
+    if spec == "github":
+        return GitHubTarget(os.environ["GH_REPO"], os.environ.get("GH_BRANCH", "main"), os.environ["GH_PAT"])
+    raise ValueError(f"unknown publish target: {spec}")
+
+# ---------- Shards ----------
+def shard_key(name):
+    toks = normalize(name).split()
+    c = toks[-1][0] if toks else "_"
+    return c if "a" <= c <= "z" else "_"
+
+def _read(raw):
+    r = csv.DictReader(io.StringIO(raw.decode("utf-8")))
+    return list(r.fieldnames or []), list(r)
+
+def _write(cols, rows):
+    buf = io.StringIO()
+    w = csv.DictWriter(buf, fieldnames=cols, lineterminator="\n", extrasaction="ignore")
+    w.writeheader(); w.writerows(rows)
+    return buf.getvalue().encode("utf-8")
+
+def shards(cols, rows):
+    out = {}
+    for row in rows:
+        out.setdefault(shard_key(row.get("Name", "")), []).append(row)
+    return {k: _write(cols, v) for k, v in sorted(out.items())}
+
+def _sha(b):
+    return hashlib.sha1(b).hexdigest()
+
+def _by_name(rows):
+    # first row wins on duplicate names, as in the app's name index
+    out = {}
+    for row in rows:
+        out.setdefault(normalize(row.get("Name", "")), row)
+    return out
+
+def diff(before, after, cols):
+    # before/after: rows of the shards that moved -> per-fighter, per-field delta
+    b, a = _by_name(before), _by_name(after)
+    changed = {}
+    for k in b.keys() & a.keys():
+        d = {c: [b[k].get(c, ""), a[k].get(c, "")] for c in cols if b[k].get(c, "") != a[k].get(c, "")}
+        if d: changed[a[k]["Name"]] = d
+    return {"added": sorted(a[k]["Name"] for k in a.keys() - b.keys()),
+            "removed": sorted(b[k]["Name"] for k in b.keys() - a.keys()),
+            "changed": dict(sorted(changed.items()))}
+
+# ---------- Publish ----------
+def publish(csv_path: Path, target, prefix=PREFIX, dry_run=False):
+    cols, rows = _read(Path(csv_path).read_bytes())
+    new = shards(cols, rows)
+    sums = {k: _sha(v) for k, v in new.items()}
+    raw = target.read(f"{prefix}/manifest.json")
+    old = json.loads(raw) if raw else {"columns": None, "shards": {}}
+
+    moved = [k for k in new if old["shards"].get(k, {}).get("sha") != sums[k]]
+    dropped = [k for k in old["shards"] if k not in new]
+    if not moved and not dropped and old["columns"] == cols:
+        print(f"[info] publish: no changes ({len(rows)} fighters)", file=sys.stderr)
+        return {"changed": False, "fighters": len(rows)}
+
+    before, after = [], []
+    for k in moved + dropped:
+        prev = target.read(f"{prefix}/{k}.csv") if k in old["shards"] else None
+        if prev: before += _read(prev)[1]
+        if k in new: after += _read(new[k])[1]
+    delta = diff(before, after, cols)
+
+    roster_sha = _sha("".join(sums[k] for k in sorted(sums)).encode())
+    stamp = time.strftime("%Y%m%dT%H%M%SZ", time.gmtime())
+    manifest = {"columns": cols, "sha": roster_sha, "published": stamp, "fighters": len(rows),
+                "shards": {k: {"sha": sums[k], "rows": new[k].count(b"\n") - 1} for k in new}}
+    files = {f"{prefix}/{k}.csv": new[k] for k in moved}
+    files.update({f"{prefix}/{k}.csv": None for k in dropped})
+    files[f"{prefix}/changes/{stamp}-{roster_sha[:12]}.json"] = json.dumps(
+        {"published": stamp, "sha": roster_sha, "previous": old.get("sha"), **delta}, indent=1).encode()
+    files[f"{prefix}/manifest.json"] = json.dumps(manifest, indent=1).encode()
+
+    summary = {"changed": True, "fighters": len(rows), "shards": len(moved), "deleted": len(dropped),
+               "added": len(delta["added"]), "removed": len(delta["removed"]), "updated": len(delta["changed"]),
+               "bytes": sum(len(v) for v in files.values() if v)}
+    msg = (f"Update roster: +{summary['added']} -{summary['removed']} ~{summary['updated']} fighters "
+           f"({len(moved)} shards)")
+    if not dry_run:
+        summary.update(target.commit(files, msg))
+    print(f"[ok] publish: {msg}", file=sys.stderr)
+    return summary
+
+def assemble(root=".", prefix=PREFIX, out=None):
+    # shards -> one roster.csv, shards in key order; no manifest -> leave out alone
+    t = DirTarget(root)
+    raw = t.read(f"{prefix}/manifest.json")
+    if raw is None:
+        return None
+    m = json.loads(raw)
+    rows = []
+    for k in sorted(m["shards"]):
+        rows += _read(t.read(f"{prefix}/{k}.csv"))[1]
+    out = Path(out or Path(root) / "data" / "roster.csv")
+    tmp = out.with_name(out.name + ".tmp")
+    tmp.write_bytes(_write(m["columns"], rows))
+    os.replace(tmp, out)
+    return out
+
+if __name__ == "__main__":
+    import argparse
+    ap = argparse.ArgumentParser()
+    ap.add_argument("source", nargs="?", default="data/roster.csv", help='roster CSV, or "assemble"')
+    ap.add_argument("--target", help="dir:PATH or github (default: $PUBLISH_TARGET or github)")
+    ap.add_argument("--prefix", default=PREFIX)
+    ap.add_argument("--out", help="assemble: output CSV (default data/roster.csv)")
+    ap.add_argument("--dry-run", action="store_true")
+    args = ap.parse_args()
+    if args.source == "assemble":
+        out = assemble(".", args.prefix, args.out)
+        print(f"[ok] wrote {out}" if out else f"[info] no {args.prefix}/manifest.json, nothing to assemble")
+    else:
+        print(json.dumps(publish(Path(args.source), target_from_env(args.target), args.prefix, args.dry_run), indent=2))
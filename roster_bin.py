@@ -0,0 +1,151 @@
+# roster_bin.py — compact columnar roster artifact, memory-mapped on load
+#
+# Layout (little-endian):
+#   8  bytes  magic b"MMAROST\x01"
+#   4  bytes  u32 header length H
+#   H  bytes  JSON header: rows, columns (CSV order), metrics, strings,
+#             source_sha (sha1 of the CSV it was built from), section offsets
+#   ...       float32 metric block [rows x metrics], C order, 64-byte aligned;
+#             NaN = empty or non-numeric cell
+#   ...       per string column: u32 offsets [rows+1] + utf-8 blob
+#   ...       float64 model scores (model.Scores fields Z, C, R, OWN, OPP),
+#             64-byte aligned; valid only while header["model"] matches
+#             model.FINGERPRINT, so every worker process can map the scored
+#             roster instead of recomputing its own copy
+import json, os, struct, sys, time
+from pathlib import Path
+
+import numpy as np
+
+from model import FINGERPRINT, Scores, zmatrix_table
+
+MAGIC = b"MMAROST\x01"
+FORMAT = 2
+STRING_COLS = ("Name", "Stance", "LastFightDate")
+_ALIGN = 64
+
+def _pad(n):
+    return (-n) % _ALIGN
+
+class Table:
+    # Column store shared by the CSV and binary loaders. `block` may be a
+    # read-only view straight into the mmap'd file.
+    def __init__(self, columns, metrics, block, strings, source_sha=None, scores=None):
+        self.columns, self.metrics, self.block = columns, metrics, block
+        self.strings, self.source_sha = strings, source_sha
+        self.scores = scores                    # {field: array} from the file, else None
+        self.n = block.shape[0]
+        self._col = {m: j for j, m in enumerate(metrics)}
+
+    def __len__(self):
+        return self.n
+
+    def column(self, name):
+        return self.block[:, self._col[name]] if name in self._col else None
+
+def from_frame(df, source_sha=None):
+    import pandas as pd
+    columns = [str(c) for c in df.columns]
+    strings = {c: ["" if pd.isna(v) else str(v) for v in df[c].tolist()] for c in columns if c in STRING_COLS}
+    metrics = [c for c in columns if c not in strings]
+    block = np.empty((len(df), len(metrics)), dtype=np.float32)
+    for j, m in enumerate(metrics):
+        block[:, j] = pd.to_numeric(df[m], errors="coerce").to_numpy(np.float64)
+    return Table(columns, metrics, block, strings, source_sha)
+
+def write(table, path: Path, source_sha):
+    # written to a temp file and renamed, so readers never map a partial file
+    path = Path(path)
+    n = table.n
+    blobs = {}
+    for c in STRING_COLS:
+        if c not in table.strings: continue
+        enc = [s.encode("utf-8") for s in table.strings[c]]
+        offs = np.zeros(n + 1, dtype="<u4")
+        np.cumsum([len(b) for b in enc], out=offs[1:])
+        blobs[c] = (offs.tobytes(), b"".join(enc))
+    block = np.ascontiguousarray(table.block, dtype="<f4").tobytes()
+    S = Scores(zmatrix_table(table))
+    scores = {f: np.ascontiguousarray(getattr(S, f), dtype="<f8") for f in Scores.FIELDS}
+
+    header = {"format": FORMAT, "rows": n, "columns": table.columns, "metrics": table.metrics,
+              "strings": list(blobs), "source_sha": source_sha, "model": FINGERPRINT,
+              "created": time.time(), "sections": {}, "scores": {}}
+    # offsets depend on the header length, which depends on the offsets: repeat until stable
+    size = 0
+    while True:
+        pos = len(MAGIC) + 4 + size
+        pos += _pad(pos)
+        sections = {"block": pos}
+        pos += len(block) + _pad(len(block))
+        for c, (offs, blob) in blobs.items():
+            sections[c] = [pos, len(blob)]
+            pos += len(offs) + len(blob) + _pad(len(offs) + len(blob))
+        header["scores"] = {}
+        for k, a in scores.items():
+            header["scores"][k] = [pos, list(a.shape)]
+            pos += a.nbytes + _pad(a.nbytes)
+        header["sections"] = sections
+        hb = json.dumps(header).encode("utf-8")
+        if len(hb) == size: break
+        size = len(hb)
+
+    # per-process temp name: several workers may rebuild the same roster at once
+    tmp = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+    with tmp.open("wb") as f:
+        f.write(MAGIC + struct.pack("<I", len(hb)) + hb)
+        f.write(b"\0" * (sections["block"] - f.tell()))
+        f.write(block)
+        for c, (offs, blob) in blobs.items():
+            f.write(b"\0" * (sections[c][0] - f.tell()))
+            f.write(offs); f.write(blob)
+        for k, a in scores.items():
+            f.write(b"\0" * (header["scores"][k][0] - f.tell()))
+            f.write(a.tobytes())
+        f.flush(); os.fsync(f.fileno())
+    os.replace(tmp, path)
+
+def load(path: Path, expect_sha=None):
+    # Map the file read-only; returns None if missing, stale, corrupt or not ours.
+    path = Path(path)
+    try:
+        mm = np.memmap(path, dtype=np.uint8, mode="r")
+    except (FileNotFoundError, ValueError):
+        return None
+    if bytes(mm[:len(MAGIC)]) != MAGIC:
+        return None
+    try:
+        (hl,) = struct.unpack("<I", bytes(mm[len(MAGIC):len(MAGIC) + 4]))
+        header = json.loads(bytes(mm[len(MAGIC) + 4:len(MAGIC) + 4 + hl]))
+        if header.get("format") != FORMAT or header.get("model") != FINGERPRINT \
+                or (expect_sha and header.get("source_sha") != expect_sha):
+            return None
+        n, metrics, sec = header["rows"], header["metrics"], header["sections"]
+        block = np.ndarray((n, len(metrics)), dtype="<f4", buffer=mm, offset=sec["block"])
+        strings = {}
+        for c in header["strings"]:
+            start, size = sec[c]
+            offs = np.ndarray((n + 1,), dtype="<u4", buffer=mm, offset=start)
+            blob = bytes(mm[start + 4 * (n + 1):start + 4 * (n + 1) + size])
+            strings[c] = [blob[offs[i]:offs[i + 1]].decode("utf-8") for i in range(n)]
+        scores = {k: np.ndarray(shape, dtype="<f8", buffer=mm, offset=off) for k, (off, shape) in header["scores"].items()}
+        return Table(header["columns"], metrics, block, strings, header.get("source_sha"), scores)
+    except (ValueError, TypeError, KeyError, AttributeError, struct.error) as e:
+        # truncated or corrupt body: the caller re-parses the CSV and rewrites it
+        print(f"[warn] {path}: unreadable roster.bin ({type(e).__name__}: {e})", file=sys.stderr)
+        return None
+
+def build_from_csv(csv_path: Path, bin_path: Path = None):
+    import hashlib
+    raw = Path(csv_path).read_bytes()
+    from io import BytesIO
+    import pandas as pd
+    table = from_frame(pd.read_csv(BytesIO(raw)))
+    bin_path = bin_path or Path(csv_path).with_suffix(".bin")
+    write(table, bin_path, hashlib.sha1(raw).hexdigest())
+    return bin_path
+
+if __name__ == "__main__":
+    # python roster_bin.py data/roster.csv  -> data/roster.bin
+    out = build_from_csv(Path(sys.argv[1] if len(sys.argv) > 1 else "data/roster.csv"))
+    print(f"[ok] wrote {out}")
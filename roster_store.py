@@ -0,0 +1,116 @@
+# roster_store.py — in-memory roster with atomic hot reload
+import hashlib, os, sys, threading, time
+from io import BytesIO
+from pathlib import Path
+
+import roster_bin
+from metrics import timer
+from model import Scores, zmatrix_table
+from name_index import NameIndex
+from workers import flock
+
+
+class Roster:
+    # Immutable snapshot of one roster generation. Never mutated after build,
+    # so a request holding a reference always sees a complete table.
+    def __init__(self, table, version, sha, mtime, source="csv"):
+        self.table = table
+        self.version = version
+        self.sha = sha
+        self.mtime = mtime
+        self.source = source
+        self.loaded_at = time.time()
+        # first row wins on duplicate names; lookups ignore case, accents, punctuation
+        self.name_list = table.strings.get("Name", [""] * len(table))
+        self.index = NameIndex(self.name_list)
+        # z-matrix + composites: mapped from roster.bin (shared by every worker
+        # process through the page cache) or computed once per load
+        self.scores = Scores.from_arrays(table.scores) if table.scores else Scores(zmatrix_table(table))
+        self.names = sorted(set(n for n in self.name_list if n))
+
+    def __len__(self):
+        return len(self.table)
+
+    def find(self, name):
+        return self.index.lookup(name)
+
+    def idx(self, name):
+        i = self.find(name)
+        if i is None: raise ValueError(f"Fighter not found: {name}")
+        return i
+
+    def info(self):
+        return {"version": self.version, "sha": self.sha, "mtime": self.mtime,
+                "loaded_at": self.loaded_at, "fighters": len(self), "source": self.source,
+                "shared": self.table.scores is not None}
+
+
+class RosterStore:
+    # Holds the current Roster and swaps in a new one when the CSV changes
+    # (mtime first, then content hash so a touch() doesn't bump the version).
+    # The CSV stays the source of truth; <roster>.bin is used when its
+    # source_sha matches, and (re)written after a CSV parse so the next
+    # process start or worker can mmap it instead of parsing.
+    def __init__(self, path: Path, check_every=None):
+        self.path = Path(path)
+        self.bin_path = self.path.with_suffix(".bin")
+        self.check_every = float(os.getenv("ROSTER_CHECK_SECS", "2") if check_every is None else check_every)
+        self._lock = threading.Lock()
+        self._checked = 0.0
+        self._current = None
+        self.reload(force=True)
+
+    def _build_lock(self):
+        # Serializes .bin rebuilds across worker processes: the first one to see
+        # a new CSV parses it, the rest wait and map the file it wrote.
+        return flock(self.bin_path.with_name(self.bin_path.name + ".lock"))
+
+    def _build(self, raw, sha, mtime, version):
+        table = roster_bin.load(self.bin_path, expect_sha=sha)
+        if table is not None:
+            return Roster(table, version, sha, mtime, source="bin")
+        with self._build_lock():
+            table = roster_bin.load(self.bin_path, expect_sha=sha)
+            if table is not None:
+                return Roster(table, version, sha, mtime, source="bin")
+            import pandas as pd       # only when the CSV has to be parsed
+            table = roster_bin.from_frame(pd.read_csv(BytesIO(raw)), sha)
+            try:
+                roster_bin.write(table, self.bin_path, sha)
+                table = roster_bin.load(self.bin_path, expect_sha=sha) or table
+            except OSError as e:
+                print(f"[warn] could not write {self.bin_path}: {e}", file=sys.stderr)
+        return Roster(table, version, sha, mtime)
+
+    def reload(self, force=False):
+        with self._lock:
+            cur = self._current
+            try:
+                mtime = self.path.stat().st_mtime
+            except FileNotFoundError:
+                if cur is None: raise
+                return cur
+            self._checked = time.monotonic()
+            if not force and cur is not None and mtime == cur.mtime:
+                return cur
+            raw = self.path.read_bytes()
+            sha = hashlib.sha1(raw).hexdigest()
+            if cur is not None and sha == cur.sha:
+                cur.mtime = mtime
+                return cur
+            try:
+                with timer("roster_load"):
+                    new = self._build(raw, sha, mtime, (cur.version + 1) if cur else 1)
+            except Exception as e:
+                # keep serving the previous generation on a bad/half-written file
+                if cur is None: raise
+                print(f"[warn] roster reload failed, keeping v{cur.version}: {e}", file=sys.stderr)
+                return cur
+            self._current = new
+            print(f"[info] roster v{new.version} loaded from {new.source}: {len(new)} fighters", file=sys.stderr)
+            return new
+
+    def get(self):
+        if time.monotonic() - self._checked >= self.check_every:
+            return self.reload()
+        return self._current
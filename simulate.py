@@ -0,0 +1,94 @@
+# simulate.py — Monte Carlo fight simulation with round-level finish hazards
+#
+# The closed-form model fixes how often each (winner, method) happens overall:
+# P_A * qA_KO, P_A * qA_SUB, ... The simulation spreads the finishes over
+# rounds using the fighters' composites:
+#   * total finish probability F = sum of the four finish shares; the per-round
+#     hazard is h(r) = h0 * exp(slope * (r-1)), with h0 solved so that
+#     1 - prod(1 - h(r)) == F
+#   * slope > 0 (later finishes) when both fighters fade — low CARDIO_ret /
+#     LateRet and high PACE — and < 0 (early finishes) when striking power
+#     (STR) outweighs durability (DUR)
+#   * within a round, the finish goes to (fighter, method) in proportion to its
+#     closed-form share, tilted each round toward the fighter with better cardio;
+#     the tilted table is then rebalanced (iterative proportional fitting) so that
+#     sum_r P(finish in r) * share[r, k] is still the closed-form share of k. The
+#     tilt moves a fighter's finishes between rounds, never between fighters
+#   * fights that survive every round go to the cards with the DEC shares
+import numpy as np
+
+from model import COMPOSITES, METRICS, predict_idx
+
+OUTCOMES = ["A_KO", "A_SUB", "B_KO", "B_SUB"]
+_STR, _PACE, _DUR = (COMPOSITES.index(c) for c in ("STR", "PACE", "DUR"))
+_CARDIO, _LATE = METRICS.index("CARDIO_ret"), METRICS.index("LateRet")
+
+def _cardio(S, i):
+    return 0.5 * (S.Z[i, _CARDIO] + S.Z[i, _LATE])
+
+def hazards(S, ia, ib, rounds=3):
+    # -> (h[rounds], share[rounds, 4] over OUTCOMES, P(A | decision), closed-form dict)
+    p = {k: float(v) for k, v in predict_idx(S, ia, ib).items()}
+    share = np.array([p["P_A_KO"], p["P_A_SUB"], p["P_B_KO"], p["P_B_SUB"]])
+    F = min(share.sum(), 1 - 1e-9)
+
+    cA, cB = _cardio(S, ia), _cardio(S, ib)
+    fade = 0.5 * (S.C[ia, _PACE] + S.C[ib, _PACE]) - 0.5 * (cA + cB)
+    power = 0.5 * (S.C[ia, _STR] + S.C[ib, _STR]) - 0.5 * (S.C[ia, _DUR] + S.C[ib, _DUR])
+    slope = float(np.clip(0.10 * fade - 0.10 * power, -0.6, 0.6))
+    w = np.exp(slope * np.arange(rounds))
+
+    lo, hi = 0.0, 1.0 / w.max()       # bisection on h0 for cumulative finish prob F
+    for _ in range(60):
+        h0 = 0.5 * (lo + hi)
+        if 1 - np.prod(1 - h0 * w) < F: lo = h0
+        else: hi = h0
+    h = h0 * w
+
+    tilt = np.exp(0.15 * np.arange(rounds) * (cA - cB))          # >1: A's cardio edge grows
+    q = h * np.concatenate([[1.0], np.cumprod(1 - h)[:-1]])     # P(first finish in round r)
+    M = q[:, None] * share[None, :] * np.stack([tilt, tilt, 1 / tilt, 1 / tilt], axis=1)
+    col = share * (q.sum() / share.sum()) if share.sum() > 0 else share
+    for _ in range(200):                       # rows -> q (per-round), columns -> col (per-outcome)
+        M *= np.divide(col, M.sum(axis=0), out=np.zeros_like(col), where=M.sum(axis=0) > 0)[None, :]
+        M *= np.divide(q, M.sum(axis=1), out=np.zeros_like(q), where=M.sum(axis=1) > 0)[:, None]
+        if np.abs(M.sum(axis=0) - col).max() < 1e-12: break
+    sh = np.divide(M, q[:, None], out=np.full_like(M, 0.25), where=q[:, None] > 0)
+    dec = p["P_A_DEC"] + p["P_B_DEC"]
+    pA_dec = p["P_A_DEC"] / dec if dec > 0 else 0.5
+    return h, sh, pA_dec, p
+
+def simulate(S, ia, ib, n=100_000, rounds=3, seed=None):
+    rng = np.random.default_rng(seed)
+    h, sh, pA_dec, p = hazards(S, ia, ib, rounds)
+
+    # round of the first finish (rounds == went the distance)
+    finish = rng.random((n, rounds), dtype=np.float32) < h.astype(np.float32)
+    rnd = np.where(finish.any(axis=1), finish.argmax(axis=1), rounds)
+    # who/how for finishes, decision winner for the rest, from one uniform draw
+    u = rng.random(n)
+    cum = np.cumsum(sh, axis=1)                                  # [rounds, 4]
+    fin = rnd < rounds
+    out = np.full(n, -1, dtype=np.int8)
+    out[fin] = (u[fin, None] > cum[rnd[fin]]).sum(axis=1).clip(max=3)
+    a_dec = ~fin & (u < pA_dec)
+
+    def est(mask):
+        m = float(np.count_nonzero(mask)) / n
+        return {"p": m, "se": float(np.sqrt(m * (1 - m) / n))}
+
+    by_round = []
+    for r in range(rounds):
+        at = rnd == r
+        by_round.append({"round": r + 1, **{o: est(at & (out == k)) for k, o in enumerate(OUTCOMES)}})
+    a_win = (fin & (out < 2)) | a_dec
+    return {
+        "n": n, "rounds": rounds, "seed": seed,
+        "P_A": est(a_win),
+        "by_round": by_round,
+        "totals": {"A_KO": est(out == 0), "A_SUB": est(out == 1), "A_DEC": est(a_dec),
+                   "B_KO": est(out == 2), "B_SUB": est(out == 3), "B_DEC": est(~fin & ~a_dec)},
+        "goes_distance": est(~fin),
+        "hazard": h.tolist(),
+        "closed_form": p,
+    }
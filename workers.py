@@ -0,0 +1,86 @@
+# workers.py — what each server process is serving, visible to all of them
+#
+# With `uvicorn --workers N` every process has its own RosterStore. Each one
+# writes a small JSON heartbeat (pid, roster version/sha) to WORKER_DIR, so
+# whichever worker answers /healthz can report the whole pool: how many are
+# alive and whether they have all swapped to the same roster.
+import atexit, json, os, threading, time
+from contextlib import contextmanager
+from pathlib import Path
+
+try:
+    import fcntl
+except ImportError:         # no cross-process lock on Windows; each process works alone
+    fcntl = None
+
+WORKER_DIR = Path(os.getenv("WORKER_DIR", "data/.workers"))
+EXPECTED = int(os.getenv("WEB_CONCURRENCY", "1"))      # uvicorn's default for --workers
+
+@contextmanager
+def flock(path):
+    # Exclusive advisory lock on path, shared by every worker process on the host
+    if fcntl is None:
+        yield; return
+    try:
+        f = open(path, "a")
+    except OSError:
+        yield; return
+    with f:
+        fcntl.flock(f, fcntl.LOCK_EX)
+        try: yield
+        finally: fcntl.flock(f, fcntl.LOCK_UN)
+
+def _alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+class Registry:
+    def __init__(self, root=WORKER_DIR, ttl=30.0):
+        self.root, self.ttl = Path(root), ttl
+        self.pid = os.getpid()
+        self.path = self.root / f"{self.pid}.json"
+        self.started = time.time()
+        atexit.register(self.leave)
+
+    def beat(self, **state):
+        try:
+            self.root.mkdir(parents=True, exist_ok=True)
+            tmp = self.path.with_suffix(".tmp")
+            tmp.write_text(json.dumps({"pid": self.pid, "started": self.started, "beat": time.time(), **state}))
+            os.replace(tmp, self.path)
+        except OSError:
+            pass
+
+    def leave(self):
+        self.path.unlink(missing_ok=True)
+
+    def live(self):
+        # heartbeats from running processes; files left by dead ones are removed
+        out = []
+        for p in self.root.glob("*.json"):
+            try:
+                w = json.loads(p.read_text())
+            except (OSError, ValueError):
+                continue
+            if not _alive(w.get("pid", -1)) or time.time() - w.get("beat", 0) > self.ttl:
+                p.unlink(missing_ok=True)
+                continue
+            out.append(w)
+        return sorted(out, key=lambda w: w["pid"])
+
+    def start(self, state, every=5.0):
+        # background heartbeat; state() also drives the roster reload check, so
+        # idle workers pick up a new roster without waiting for a request
+        def loop():
+            while True:
+                try:
+                    self.beat(**state())
+                except Exception:
+                    pass
+                time.sleep(every)
+        threading.Thread(target=loop, name="worker-heartbeat", daemon=True).start()